@@ -1,16 +1,48 @@
 from flask import Flask
 from .db import close_db
+from .cache import LRUCache
+from .ingest_buffer import IngestBuffer
+from .live import LiveHub
+from .metrics import INGEST_QUEUE_DEPTH
 from .routes.ingest import bp as ingest_bp
+from .routes.metrics import bp as metrics_bp
 from .routes.query import bp as query_bp
 from .routes.ui import bp as ui_bp
+from .routes.units import bp as units_bp
 
-def create_app():
+def create_app(overrides=None):
     app = Flask(__name__)
     app.config.from_object("app.config.Config")
+    # DB_PATH 등은 아래에서 버퍼/허브를 만들 때 쓰이므로 생성 전에 덮어써야 한다
+    app.config.update(overrides or {})
 
     app.teardown_appcontext(close_db)
     app.register_blueprint(ingest_bp, url_prefix="/api")
     app.register_blueprint(query_bp, url_prefix="/api")
+    app.register_blueprint(units_bp, url_prefix="/api")
     app.register_blueprint(ui_bp)
+    app.register_blueprint(metrics_bp)
+
+    app.extensions["kpi_cache"] = LRUCache(app.config["KPI_CACHE_SIZE"])
+    app.extensions["dedupe_cache"] = LRUCache(app.config["DEDUPE_CACHE_SIZE"])
+    app.extensions["live_hub"] = LiveHub(
+        app.config["DB_PATH"],
+        pragmas=app.config["STORAGE_PRAGMAS"],
+        poll_ms=app.config["LIVE_POLL_MS"],
+    )
+
+    if app.config["INGEST_BUFFER_ENABLED"]:
+        buf = IngestBuffer(
+            app.config["DB_PATH"],
+            pragmas=app.config["STORAGE_PRAGMAS"],
+            partition=app.config["RAW_EVENTS_PARTITION"],
+            max_latency_ms=app.config["INGEST_BUFFER_MAX_LATENCY_MS"],
+            batch_size=app.config["INGEST_BUFFER_BATCH_SIZE"],
+            max_queue=app.config["INGEST_BUFFER_MAX_QUEUE"],
+            seen=app.extensions["dedupe_cache"],
+        )
+        buf.start()
+        INGEST_QUEUE_DEPTH.set_function(buf.depth)
+        app.extensions["ingest_buffer"] = buf
 
     return app
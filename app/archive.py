@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import shutil
+from datetime import date, timedelta
+import numpy as np
+
+from app import downtime
+from app.kpi import with_cycle_stats
+from app.shifts import EPOCH
+
+# 지난 기간의 raw_events 를 일 단위 컬럼 파일(.npy)로 내보내고 mmap 으로 집계
+# 문자열 컬럼은 사전 인코딩(int32 코드, -1 = NULL), cycle_time 은 float64(NaN = NULL)
+STRING_COLUMNS = ["device_id", "line_id", "station_id", "event_type", "unit_id", "defect_code", "stop_reason"]
+CHUNK_ROWS = 100000
+
+def day_bounds(d: date):
+    lo = int(time.mktime(d.timetuple()))
+    hi = int(time.mktime((d + timedelta(days=1)).timetuple()))
+    return lo, hi
+
+def day_dir(root, d: date):
+    return os.path.join(root, d.strftime("%Y%m%d"))
+
+def archived_days(root):
+    if not os.path.isdir(root):
+        return []
+    days = []
+    for name in sorted(os.listdir(root)):
+        # YYYYMMDD 디렉터리만 (쓰다 만 .tmp / 교체 중인 .old 는 제외)
+        if len(name) == 8 and name.isdigit() and os.path.exists(os.path.join(root, name, "meta.json")):
+            days.append(date(int(name[:4]), int(name[4:6]), int(name[6:8])))
+    return days
+
+def clean_stale(root):
+    # 중단된 export 가 남긴 .tmp / .old 디렉터리 정리
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if name.endswith((".tmp", ".old")):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+def export_day(conn, root, d: date):
+    lo, hi = day_bounds(d)
+    # COUNT 와 SELECT 를 한 읽기 트랜잭션(WAL 스냅샷)에서 해야 그 사이 적재된 늦은 이벤트로 배열 크기가 어긋나지 않는다
+    conn.execute("BEGIN")
+    try:
+        n = conn.execute(
+            "SELECT COUNT(*) FROM raw_events WHERE ts >= ? AND ts < ?", (lo, hi)
+        ).fetchone()[0]
+
+        out = day_dir(root, d)
+        tmp = out + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        def column(name, dtype):
+            return np.lib.format.open_memmap(os.path.join(tmp, f"{name}.npy"), mode="w+", dtype=dtype, shape=(n,))
+
+        ids = column("id", np.int64)
+        ts = column("ts", np.int64)
+        ct = column("cycle_time", np.float64)
+        codes = {c: column(c, np.int32) for c in STRING_COLUMNS}
+        dicts = {c: {} for c in STRING_COLUMNS}
+
+        cur = conn.execute(f"""
+            SELECT id, ts, cycle_time, {", ".join(STRING_COLUMNS)}
+            FROM raw_events
+            WHERE ts >= ? AND ts < ?
+            ORDER BY id
+        """, (lo, hi))
+
+        pos = 0
+        while True:
+            rows = cur.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            end = pos + len(rows)
+            ids[pos:end] = [r[0] for r in rows]
+            ts[pos:end] = [r[1] for r in rows]
+            ct[pos:end] = [np.nan if r[2] is None else r[2] for r in rows]
+            for i, c in enumerate(STRING_COLUMNS, start=3):
+                d_ = dicts[c]
+                codes[c][pos:end] = [-1 if r[i] is None else d_.setdefault(r[i], len(d_)) for r in rows]
+            pos = end
+    finally:
+        conn.rollback()
+
+    for arr in (ids, ts, ct, *codes.values()):
+        arr.flush()
+    del ids, ts, ct, codes
+
+    meta = {
+        "date": d.isoformat(),
+        "rows": n,
+        "ts_range": [lo, hi],
+        "dictionaries": {c: list(v) for c, v in dicts.items()},
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # meta.json 까지 다 쓴 뒤에 이름을 바꿔 반쯤 쓴 아카이브가 보이지 않게 한다
+    # 다시 내보내는 경우 기존 디렉터리는 비어 있지 않아 바로 덮어쓸 수 없으므로 옆으로 옮긴 뒤 교체
+    if os.path.exists(out):
+        old = out + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(out, old)
+        os.replace(tmp, out)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, out)
+    return n
+
+def load_day(root, d: date, columns):
+    path = day_dir(root, d)
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    cols = {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r") for c in columns}
+    return meta, cols
+
+def scan_kpi(root, start: date, end: date, calendar, line_id=None):
+    result = {}
+    open_stops = {}
+    closed = []
+    d = start
+    # NIGHT 교대는 다음 날 08시까지이므로 end 다음 날 파일까지 읽는다
+    while d <= end + timedelta(days=1):
+        if os.path.exists(os.path.join(day_dir(root, d), "meta.json")):
+            meta, cols = load_day(root, d, ["ts", "line_id", "event_type", "cycle_time"])
+            if meta["rows"]:
+                _scan_day(meta, cols, start, end, calendar, line_id, result)
+                _pair_stops(meta, cols, line_id, open_stops, closed)
+        d += timedelta(days=1)
+
+    # 워커와 같이 짝지은 정지 구간을 교대 경계에서 잘라 stop_minutes 에 더한다
+    lo, hi = start.isoformat(), end.isoformat()
+    for line, s_ts, e_ts, _ in closed:
+        for p_start, p_end, date_, shift in calendar.split(s_ts, e_ts):
+            if lo <= date_ <= hi:
+                _state(result, (date_, shift, line))["stop_minutes"] += downtime.minutes(p_end - p_start)
+
+    rows = [
+        {"date": k[0], "shift": k[1], "line_id": k[2], **v}
+        for k, v in sorted(result.items(), key=lambda kv: (kv[0][2], kv[0][0], kv[0][1]))
+    ]
+    return [with_cycle_stats(r) for r in rows]
+
+def _state(result, key):
+    s = result.get(key)
+    if s is None:
+        s = result[key] = {
+            "produced_count": 0, "defect_count": 0, "stop_minutes": 0,
+            "ct_count": 0, "ct_sum": 0.0, "ct_sumsq": 0.0, "ct_min": None, "ct_max": None,
+        }
+    return s
+
+def _pair_stops(meta, cols, line_id, open_stops, closed):
+    # 정지 이벤트만 골라 id 순서(= 파일 순서)대로 짝짓는다
+    dicts = meta["dictionaries"]
+    et = np.asarray(cols["event_type"])
+    names = dicts["event_type"]
+    wanted = [names.index(n) for n in ("STOP_START", "STOP_END") if n in names]
+    if not wanted:
+        return
+    idx = np.flatnonzero(np.isin(et, wanted))
+    ts = np.asarray(cols["ts"])[idx].tolist()
+    lines = np.asarray(cols["line_id"])[idx].tolist()
+    for t, code, line in zip(ts, et[idx].tolist(), lines):
+        ev = {"ts": t, "event_type": names[code], "line_id": dicts["line_id"][line], "stop_reason": None}
+        if line_id is None or ev["line_id"] == line_id:
+            downtime.fold_event(open_stops, closed, ev)
+
+def _scan_day(meta, cols, start, end, calendar, line_id, result):
+    dicts = meta["dictionaries"]
+    ts = np.asarray(cols["ts"])
+    line = np.asarray(cols["line_id"])
+    et = np.asarray(cols["event_type"])
+    ct = np.asarray(cols["cycle_time"], dtype=np.float64)
+
+    mask = np.ones(len(ts), dtype=bool)
+    if line_id is not None:
+        if line_id not in dicts["line_id"]:
+            return
+        mask &= line == dicts["line_id"].index(line_id)
+
+    day, shift = calendar.bucket(ts)
+    lo = (start - EPOCH).days
+    hi = (end - EPOCH).days
+    mask &= (day >= lo) & (day <= hi)
+    if not mask.any():
+        return
+
+    day, shift, line, et, ct = day[mask], shift[mask], line[mask], et[mask], ct[mask]
+    n_shifts = len(calendar.shift_names)
+    n_lines = len(dicts["line_id"])
+    keys = (day.astype(np.int64) * n_shifts + shift) * n_lines + line
+    uniq, inv = np.unique(keys, return_inverse=True)
+    n = len(uniq)
+
+    def code(name):
+        vals = dicts["event_type"]
+        return vals.index(name) if name in vals else -2
+
+    produced = np.bincount(inv, weights=(et == code("PRODUCED")), minlength=n)
+    defect = np.bincount(inv, weights=(et == code("DEFECT")), minlength=n)
+    stopm = np.bincount(inv, weights=(et == code("STOP_MINUTE")), minlength=n)
+
+    has_ct = ~np.isnan(ct)
+    ctz = np.where(has_ct, ct, 0.0)
+    ct_count = np.bincount(inv, weights=has_ct, minlength=n)
+    ct_sum = np.bincount(inv, weights=ctz, minlength=n)
+    ct_sumsq = np.bincount(inv, weights=ctz * ctz, minlength=n)
+    ct_min = np.full(n, np.inf)
+    ct_max = np.full(n, -np.inf)
+    np.minimum.at(ct_min, inv[has_ct], ct[has_ct])
+    np.maximum.at(ct_max, inv[has_ct], ct[has_ct])
+
+    line_names = dicts["line_id"]
+    for i, k in enumerate(uniq.tolist()):
+        day_shift, line_code = divmod(k, n_lines)
+        day_code, shift_code = divmod(day_shift, n_shifts)
+        key = (
+            calendar.date_label(day_code),
+            calendar.shift_names[shift_code],
+            line_names[line_code],
+        )
+        s = _state(result, key)
+        s["produced_count"] += int(produced[i])
+        s["defect_count"] += int(defect[i])
+        s["stop_minutes"] += int(stopm[i])
+        s["ct_count"] += int(ct_count[i])
+        s["ct_sum"] += float(ct_sum[i])
+        s["ct_sumsq"] += float(ct_sumsq[i])
+        if ct_count[i]:
+            s["ct_min"] = float(ct_min[i]) if s["ct_min"] is None else min(s["ct_min"], float(ct_min[i]))
+            s["ct_max"] = float(ct_max[i]) if s["ct_max"] is None else max(s["ct_max"], float(ct_max[i]))
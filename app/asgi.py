@@ -0,0 +1,289 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app import wire
+from app.cache import LRUCache
+from app.config import Config
+from app.events import dedupe_key_of, insert_new_events, invalid_fields, missing_fields, to_row
+from app.metrics import DB_COMMIT_SECONDS, INGEST_BATCH_ROWS, INGEST_QUEUE_DEPTH, INGEST_REQUEST_SECONDS, render
+from app.routes.ingest import BATCH_BODY_ERRORS, batch_summary, decode_batch
+from app.routes.query import kpi_etag, kpi_headers, load_kpi_rows, summary_watermark
+from app.storage import connect
+
+# asyncio 기반 API: uvicorn "app.asgi:create_asgi_app" --factory
+# 장비 연결이 많아도 SQLite 쓰기는 큐 뒤의 writer 태스크 하나와 전용 스레드 하나가 맡는다
+
+class SQLiteWriter:
+    def __init__(self, db_path, pragmas=None, partition=None, batch_size=500, max_queue=10000):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.partition = partition
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self.conn = None
+        self.task = None
+        self.closed = False
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        # 연결은 writer 스레드에서 만들고 그 스레드에서만 사용
+        self.conn = await loop.run_in_executor(self.executor, connect, self.db_path, self.pragmas)
+        self.task = asyncio.create_task(self._run())
+
+    def _put(self, item):
+        # 종료 표시 뒤에는 아무것도 넣지 않는다. 종료 중 요청은 큐가 찬 것처럼 503 으로 돌려보낸다
+        if self.closed:
+            raise asyncio.QueueFull
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, fut))
+        return fut
+
+    async def submit(self, row, key=None):
+        # 커밋이 끝나야 응답하므로 기존 Flask 엔드포인트와 같은 보장을 유지. 새로 쓴 이벤트면 True
+        return await self._put((row, key))
+
+    async def submit_many(self, items):
+        # 묶음 요청: 일부만 큐에 들어가는 일이 없도록 자리를 먼저 확인. 항목별 결과는 True/False 또는 예외
+        if self.closed or self.queue.maxsize - self.queue.qsize() < len(items):
+            raise asyncio.QueueFull
+        futs = [self._put(item) for item in items]
+        return await asyncio.gather(*futs, return_exceptions=True)
+
+    def _commit(self, items):
+        rows = [row for row, _ in items]
+        try:
+            fresh = insert_new_events(self.conn, rows, [key for _, key in items], self.partition)
+            with DB_COMMIT_SECONDS.labels("asgi").time():
+                self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        INGEST_BATCH_ROWS.labels("asgi").observe(sum(fresh))
+        return fresh
+
+    def _write(self, items):
+        # 항목별 결과: 새 이벤트 여부 또는 예외. 배치가 실패하면 한 건씩 다시 써서
+        # 문제 행을 보낸 요청만 실패시키고 같은 배치의 다른 요청은 정상 응답
+        try:
+            return self._commit(items)
+        except Exception:
+            if len(items) == 1:
+                raise
+        results = []
+        for item in items:
+            try:
+                results.append(self._commit([item])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            items = []
+            while not items or (len(items) < self.batch_size and not self.queue.empty()):
+                item = await self.queue.get()
+                if item is None:
+                    stopping = True
+                    break
+                items.append(item)
+            if not items:
+                continue
+            # 어떤 오류든 이 배치의 요청만 실패시키고 계속 돈다 (태스크가 죽으면 이후 요청이 영영 응답을 못 받음)
+            try:
+                fresh = await loop.run_in_executor(self.executor, self._write, [item for item, _ in items])
+            except Exception as e:
+                print(f"[asgi-writer] batch of {len(items)} failed ({e!r})")
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), ok in zip(items, fresh):
+                if fut.done():
+                    continue
+                if isinstance(ok, Exception):
+                    fut.set_exception(ok)
+                else:
+                    fut.set_result(ok)
+
+    async def stop(self):
+        # 종료 표시를 큐 맨 뒤에 넣어 앞서 들어온 이벤트를 모두 커밋한 뒤 멈춘다
+        # closed 이후로는 submit 이 큐에 넣지 않으므로 종료 표시가 항상 마지막 항목이다
+        self.closed = True
+        await self.queue.put(None)
+        await self.task
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.conn.close)
+        self.executor.shutdown()
+
+class ReadPool:
+    def __init__(self, db_path, pragmas=None, workers=4):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sqlite-reader")
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_path, self.pragmas)
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    async def run(self, fn, *args):
+        def call():
+            return fn(self._conn(), *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+def _kpi_snapshot(db, date):
+    db.execute("BEGIN")
+    try:
+        watermark = summary_watermark(db)
+        body = json.dumps(load_kpi_rows(db, date), ensure_ascii=False)
+    finally:
+        db.rollback()
+    return watermark, body
+
+def create_asgi_app(config=Config):
+    writer = SQLiteWriter(
+        config.DB_PATH,
+        pragmas=config.STORAGE_PRAGMAS,
+        partition=config.RAW_EVENTS_PARTITION,
+        batch_size=config.INGEST_BUFFER_BATCH_SIZE,
+        max_queue=config.INGEST_BUFFER_MAX_QUEUE,
+    )
+    readers = ReadPool(config.DB_PATH, pragmas=config.STORAGE_PRAGMAS)
+    cache = LRUCache(config.KPI_CACHE_SIZE)
+    seen = LRUCache(config.DEDUPE_CACHE_SIZE)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await writer.start()
+        yield
+        await writer.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    INGEST_QUEUE_DEPTH.set_function(writer.queue.qsize)
+
+    @app.get("/metrics")
+    async def metrics():
+        return Response(render(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/api/events")
+    async def ingest_event(request: Request):
+        with INGEST_REQUEST_SECONDS.labels("asgi.ingest_event").time():
+            return await _ingest_event(request)
+
+    async def _ingest_event(request):
+        if wire.is_binary(request.headers.get("content-type")):
+            try:
+                items = wire.decode(await request.body(), int(time.time()))
+            except ValueError as e:
+                return JSONResponse({"ok": False, "error": f"invalid body: {e}"}, status_code=400)
+            if len(items) != 1:
+                return JSONResponse({"ok": False, "error": "expected exactly one event"}, status_code=400)
+            if isinstance(items[0], dict):
+                return JSONResponse({"ok": False, "invalid": items[0]["invalid"]}, status_code=400)
+            row, key = items[0]
+        else:
+            try:
+                data = await request.json()
+            except ValueError:
+                data = {}
+            if not isinstance(data, dict):
+                data = {}
+
+            missing = missing_fields(data)
+            if missing:
+                return JSONResponse({"ok": False, "missing": missing}, status_code=400)
+            invalid = invalid_fields(data)
+            if invalid:
+                return JSONResponse({"ok": False, "invalid": invalid}, status_code=400)
+            row, key = to_row(data), dedupe_key_of(data)
+
+        if key is not None and seen.get(key):
+            return {"ok": True, "duplicate": True}
+        try:
+            fresh = await writer.submit(row, key)
+        except asyncio.QueueFull:
+            return JSONResponse({"ok": False, "error": "ingest queue full"}, status_code=503,
+                                headers={"Retry-After": "1"})
+        if key is not None:
+            seen.put(key, True)
+        return {"ok": True} if fresh else {"ok": True, "duplicate": True}
+
+    @app.post("/api/events/batch")
+    async def ingest_batch(request: Request):
+        with INGEST_REQUEST_SECONDS.labels("asgi.ingest_batch").time():
+            return await _ingest_batch(request)
+
+    async def _ingest_batch(request):
+        # Flask /api/events/batch 와 같은 레코드별 results 계약
+        ts = int(time.time())
+        try:
+            items = decode_batch(await request.body(), request.headers.get("content-type"),
+                                 request.headers.get("content-encoding"), ts)
+        except BATCH_BODY_ERRORS as e:
+            return JSONResponse({"ok": False, "error": f"invalid body: {e}"}, status_code=400)
+        if len(items) > writer.queue.maxsize:
+            return JSONResponse({"ok": False, "error": f"batch larger than {writer.queue.maxsize} events"},
+                                status_code=413)
+
+        results = []
+        pending = []
+        duplicates = 0
+        for i, item in enumerate(items):
+            if isinstance(item, dict):
+                results.append(item)
+                continue
+            row, key = item
+            if key is not None and seen.get(key):
+                results.append({"index": i, "ok": True, "duplicate": True})
+                duplicates += 1
+                continue
+            results.append({"index": i, "ok": True})
+            pending.append((results[-1], row, key))
+
+        try:
+            outcomes = await writer.submit_many([(row, key) for _, row, key in pending])
+        except asyncio.QueueFull:
+            return JSONResponse({"ok": False, "error": "ingest queue full"}, status_code=503,
+                                headers={"Retry-After": "1"})
+        # 쓰다 실패한 행이 있으면 묶음 전체를 재시도하게 한다 (커밋된 행은 event_id 로 중복 처리됨)
+        failed = [ok for ok in outcomes if isinstance(ok, Exception)]
+        if failed:
+            return JSONResponse({"ok": False, "error": f"write failed: {failed[0]!r}"}, status_code=503,
+                                headers={"Retry-After": "1"})
+        for (r, _, key), ok in zip(pending, outcomes):
+            if key is not None:
+                seen.put(key, True)
+            if not ok:
+                r["duplicate"] = True
+                duplicates += 1
+        return batch_summary(results, duplicates)
+
+    @app.get("/api/kpi/today")
+    async def kpi_today(request: Request, date: str = None):
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        watermark = await readers.run(summary_watermark)
+        inm = request.headers.get("if-none-match", "")
+        if f'"{kpi_etag(date, watermark)}"' in [t.strip() for t in inm.split(",")]:
+            return Response(status_code=304, headers=kpi_headers(date, watermark))
+
+        body = cache.get((date, watermark))
+        if body is None:
+            watermark, body = await readers.run(_kpi_snapshot, date)
+            cache.put((date, watermark), body)
+        return Response(body, media_type="application/json", headers=kpi_headers(date, watermark))
+
+    return app
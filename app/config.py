@@ -1,3 +1,49 @@
 import os
+from app.storage import PROFILES
+
 class Config:
-    DB_PATH = os.path.join("instance", "smartfactory.db")
\ No newline at end of file
+    DB_PATH = os.path.join("instance", "smartfactory.db")
+
+    # SQLite PRAGMA 프로파일: safe / default / bulk
+    STORAGE_PROFILE = os.getenv("STORAGE_PROFILE", "default")
+    STORAGE_PRAGMAS = PROFILES[STORAGE_PROFILE]
+
+    # raw_events 파티션 주기: "" (단일 테이블) / day / week / month
+    # scripts/partitions.py enable 로 DB 를 전환한 뒤 같은 값으로 설정
+    RAW_EVENTS_PARTITION = os.getenv("RAW_EVENTS_PARTITION", "")
+
+    # 교대 달력: "이름@시작시각" 목록 (예: 3교대 "A@06:00,B@14:00,C@22:00"), 휴일은 YYYY-MM-DD 목록
+    SHIFTS = os.getenv("SHIFTS", "DAY@08:00,NIGHT@20:00")
+    HOLIDAYS = os.getenv("HOLIDAYS", "")
+
+    # 닫힌 기간 raw_events 의 컬럼형 아카이브 위치 (scripts/archive.py)
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join("instance", "archive"))
+
+    # /api/kpi/today 응답 캐시 항목 수 ((date, 워커 watermark) 기준 LRU)
+    KPI_CACHE_SIZE = int(os.getenv("KPI_CACHE_SIZE", "256"))
+
+    # /api/kpi/stream: summary_changes 폴링 주기 (모든 화면이 한 번의 읽기를 공유)
+    LIVE_POLL_MS = int(os.getenv("LIVE_POLL_MS", "1000"))
+
+    # group commit: 단건 이벤트를 큐에 모아 writer 스레드가 일괄 커밋
+    INGEST_BUFFER_ENABLED = os.getenv("INGEST_BUFFER_ENABLED", "0") == "1"
+    INGEST_BUFFER_MAX_LATENCY_MS = int(os.getenv("INGEST_BUFFER_MAX_LATENCY_MS", "50"))
+    INGEST_BUFFER_BATCH_SIZE = int(os.getenv("INGEST_BUFFER_BATCH_SIZE", "500"))
+    INGEST_BUFFER_MAX_QUEUE = int(os.getenv("INGEST_BUFFER_MAX_QUEUE", "10000"))
+    # event_id 중복 제거: 최근 (device_id, event_id) 를 메모리 LRU 로 먼저 거르고, 없으면 ingest_dedupe 테이블로 판정
+    DEDUPE_CACHE_SIZE = int(os.getenv("DEDUPE_CACHE_SIZE", "100000"))
+    # 이보다 오래된 event_id 는 워커가 ingest_dedupe 에서 지운다 (edge 재전송 최대 지연보다 길게)
+    DEDUPE_RETENTION_DAYS = int(os.getenv("DEDUPE_RETENTION_DAYS", "7"))
+    # 이벤트의 ts(장비 기록 시각) 허용 범위: 과거는 edge 큐 보관 기간 (중복 판정 기간을 넘지 않게),
+    # 미래는 장비 시계 오차만큼. 벗어나면 레코드를 거부
+    CLIENT_TS_MAX_AGE_DAYS = int(os.getenv("CLIENT_TS_MAX_AGE_DAYS", os.getenv("DEDUPE_RETENTION_DAYS", "7")))
+    CLIENT_TS_MAX_SKEW_SEC = int(os.getenv("CLIENT_TS_MAX_SKEW_SEC", "300"))
+    # 분 롤업 보관 기간(일). 늦게 온 이벤트로 일 롤업을 다시 합산할 때 자투리 분 버킷이 필요하므로
+    # CLIENT_TS_MAX_AGE_DAYS 보다 짧게 잡아도 그 기간 + 1일은 남긴다
+    ROLLUP_MINUTE_RETENTION_DAYS = int(os.getenv("ROLLUP_MINUTE_RETENTION_DAYS", "30"))
+    # 워커 라인 리스 유지 시간. tick 이 이보다 오래 걸리면 다른 워커가 라인을 가져갈 수 있다
+    WORKER_LEASE_SEC = int(os.getenv("WORKER_LEASE_SEC", "60"))
+    # 한 tick 이 읽는 최대 이벤트 수 (리스 시간의 1/3 이 지나도 끊는다). 밀린 이벤트는 다음 tick 이 이어서 반영
+    WORKER_TICK_MAX_EVENTS = int(os.getenv("WORKER_TICK_MAX_EVENTS", "200000"))
+    # 워커 프로세스의 /metrics 포트 (0 이면 끔). API 는 앱의 /metrics 로 노출
+    WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
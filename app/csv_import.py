@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+from app.config import Config
+from app.events import insert_events
+from app.partitions import is_partitioned
+
+# CSV 컬럼 → raw_events 컬럼 매핑
+# 각 항목은 {"column": CSV 헤더} 또는 {"value": 상수}, 선택적으로 "map" (값 치환), ts 는 "format"
+# (strptime 형식 또는 "epoch", 생략 시 epoch 숫자/ISO 문자열 자동)
+TARGET_COLUMNS = ["ts", "device_id", "line_id", "station_id", "event_type",
+                  "unit_id", "cycle_time", "defect_code", "stop_reason"]
+REQUIRED = ["ts", "device_id", "line_id", "event_type"]
+
+PRESETS = {
+    # demo/rasberrypi/factory_test.py 가 쓰는 factory_data.csv
+    "factory_test": {
+        "ts": {"column": "Time", "format": "%Y-%m-%d %H:%M:%S"},
+        "device_id": {"value": "rpi-01"},
+        "line_id": {"value": "ENG"},
+        "station_id": {"column": "Process"},
+        "unit_id": {"column": "Serial No"},
+        "event_type": {"column": "Status", "map": {"PASS": "PRODUCED", "FAIL": "DEFECT"}},
+    },
+}
+
+def load_mapping(spec):
+    # 프리셋 이름 또는 JSON 파일 경로
+    if spec in PRESETS:
+        return PRESETS[spec]
+    with open(spec, encoding="utf-8") as f:
+        return json.load(f)
+
+def parse_ts(value, fmt=None):
+    value = value.strip()
+    if fmt == "epoch" or (fmt is None and value.replace(".", "", 1).isdigit()):
+        return int(float(value))
+    if fmt is None:
+        return int(datetime.fromisoformat(value).timestamp())
+    return int(datetime.strptime(value, fmt).timestamp())
+
+def checked_ts(ts):
+    # 밀리초 epoch 를 초로 잘못 넣은 값 같은 미래 시각은 교대 달력/파티션을 터무니없이 넓히므로 레코드째 거부
+    if ts <= 0 or ts > time.time() + Config.CLIENT_TS_MAX_SKEW_SEC:
+        raise ValueError(f"ts out of range: {ts}")
+    return ts
+
+def compile_mapping(mapping, header):
+    # 헤더 위치를 미리 풀어 두고 CSV 레코드 → insert 튜플 함수를 돌려준다
+    unknown = set(mapping) - set(TARGET_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown target columns: {sorted(unknown)}")
+    missing = [c for c in REQUIRED if c not in mapping]
+    if missing:
+        raise ValueError(f"mapping is missing required columns: {missing}")
+
+    getters = []
+    for target in TARGET_COLUMNS:
+        m = mapping.get(target)
+        if m is None:
+            getters.append(lambda rec: None)
+            continue
+        if "value" in m:
+            const = m["value"]
+            getters.append(lambda rec, const=const: const)
+            continue
+        if m["column"] not in header:
+            raise ValueError(f"CSV has no column {m['column']!r} (for {target})")
+        idx = header.index(m["column"])
+        values = m.get("map")
+
+        def get(rec, idx=idx, values=values):
+            v = rec[idx].strip() if idx < len(rec) else ""
+            if values is not None:
+                v = values.get(v, v)
+            return v or None
+        if target == "ts":
+            getters.append(lambda rec, get=get, fmt=m.get("format"): checked_ts(parse_ts(get(rec) or "", fmt)))
+        elif target == "cycle_time":
+            getters.append(lambda rec, get=get: None if get(rec) is None else float(get(rec)))
+        else:
+            getters.append(get)
+
+    required_idx = [TARGET_COLUMNS.index(c) for c in REQUIRED]
+
+    def to_row(rec):
+        row = tuple(g(rec) for g in getters)
+        if any(row[i] is None for i in required_idx):
+            raise ValueError("missing required value")
+        return row
+    return to_row
+
+def _records(f, offset):
+    # csv.reader 가 레코드 하나에 필요한 줄만 당겨가므로, 레코드마다 그 끝 바이트 위치를 함께 낸다
+    pos = [offset]
+
+    def lines():
+        for raw in f:
+            pos[0] += len(raw)
+            yield raw.decode("utf-8", errors="replace")
+
+    for rec in csv.reader(lines()):
+        yield rec, pos[0]
+
+def read_header(path):
+    with open(path, "rb") as f:
+        first = f.readline()
+    return next(csv.reader(io.StringIO(first.decode("utf-8-sig")))), len(first)
+
+def load_checkpoint(conn, path):
+    row = conn.execute(
+        "SELECT byte_offset, rows_loaded, rows_rejected FROM import_checkpoint WHERE path=?", (path,)
+    ).fetchone()
+    return (0, 0, 0) if row is None else tuple(row)
+
+def save_checkpoint(conn, path, offset, loaded, rejected):
+    conn.execute("""
+        INSERT INTO import_checkpoint (path, byte_offset, rows_loaded, rows_rejected, updated_ts)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            byte_offset=excluded.byte_offset,
+            rows_loaded=excluded.rows_loaded,
+            rows_rejected=excluded.rows_rejected,
+            updated_ts=excluded.updated_ts
+    """, (path, offset, loaded, rejected, int(time.time())))
+
+def drop_indexes(conn):
+    # 대량 적재 동안 raw_events 보조 인덱스를 내렸다가 끝에 한 번에 다시 만든다
+    rows = conn.execute("""
+        SELECT name, sql FROM sqlite_master
+        WHERE type='index' AND tbl_name='raw_events' AND sql IS NOT NULL
+    """).fetchall()
+    for name, _ in rows:
+        conn.execute(f"DROP INDEX {name}")
+    conn.commit()
+    return [sql for _, sql in rows]
+
+def rebuild_indexes(conn, ddl):
+    for sql in ddl:
+        conn.execute(sql)
+    conn.commit()
+
+def load(conn, path, mapping, partition=None, commit_rows=200000, defer_indexes=False, log=print):
+    header, header_end = read_header(path)
+    to_row = compile_mapping(mapping, header)
+    offset, loaded, rejected = load_checkpoint(conn, path)
+    offset = max(offset, header_end)
+
+    # 파티션 모드는 기간별 테이블마다 인덱스가 있으므로 지연 생성 대상에서 뺀다
+    deferred = drop_indexes(conn) if defer_indexes and not is_partitioned(conn) else []
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            rows = []
+            end = offset
+            for rec, end in _records(f, offset):
+                if not rec:
+                    continue
+                try:
+                    rows.append(to_row(rec))
+                except (ValueError, IndexError):
+                    rejected += 1
+                    continue
+                if len(rows) >= commit_rows:
+                    insert_events(conn, rows, partition)
+                    loaded += len(rows)
+                    save_checkpoint(conn, path, end, loaded, rejected)
+                    conn.commit()
+                    log(f"[csv] {path} offset={end} loaded={loaded} rejected={rejected}")
+                    rows = []
+            insert_events(conn, rows, partition)
+            loaded += len(rows)
+            save_checkpoint(conn, path, end, loaded, rejected)
+            conn.commit()
+    finally:
+        if deferred:
+            log(f"[csv] rebuilding {len(deferred)} raw_events indexes")
+            rebuild_indexes(conn, deferred)
+    return loaded, rejected
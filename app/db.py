@@ -1,13 +1,29 @@
 import sqlite3
+import threading
 from flask import g, current_app
+from app.storage import connect
+
+# 스레드별 연결 풀: 요청마다 connect/close 하지 않고 스레드가 연결을 재사용
+_pool = threading.local()
+
+def get_pooled_connection(db_path, pragmas):
+    conns = getattr(_pool, "conns", None)
+    if conns is None:
+        conns = _pool.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = conns[db_path] = connect(db_path, pragmas)
+        conn.row_factory = sqlite3.Row
+    return conn
 
 def get_db():
     if "db" not in g:
-        g.db = sqlite3.connect(current_app.config["DB_PATH"])
-        g.db.row_factory = sqlite3.Row
+        g.db = get_pooled_connection(
+            current_app.config["DB_PATH"], current_app.config["STORAGE_PRAGMAS"]
+        )
     return g.db
 
 def close_db(e=None):
     db = g.pop("db", None)
-    if db is not None:
-        db.close()
+    if db is not None and db.in_transaction:
+        db.rollback()
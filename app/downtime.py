@@ -0,0 +1,58 @@
+# 라인별 STOP_START → STOP_END 를 이벤트 id 순서대로 짝지어 정지 구간을 만든다
+# 열린 정지는 stop_open 에 남겨 다음 tick 에서 이어 받는다
+
+def load_open(cur, lines):
+    # 이 워커가 리스를 가진 라인 것만
+    rows = cur.execute(f"""
+        SELECT line_id, start_ts, stop_reason FROM stop_open
+        WHERE line_id IN ({",".join("?" * len(lines))})
+    """, lines).fetchall()
+    return {r["line_id"]: (r["start_ts"], r["stop_reason"]) for r in rows}
+
+def fold_event(open_stops, closed, ev):
+    et = ev["event_type"]
+    line_id = ev["line_id"]
+    if et == "STOP_START":
+        # 이미 열린 정지의 중복 START 는 무시 (처음 시작 시각 유지)
+        if line_id not in open_stops:
+            open_stops[line_id] = (ev["ts"], ev["stop_reason"])
+    elif et == "STOP_END":
+        # 짝 없는 END 는 버린다. START 와 같은 시각의 END 는 길이 0 정지로 남긴다
+        started = open_stops.pop(line_id, None)
+        if started is not None and ev["ts"] >= started[0]:
+            closed.append((line_id, started[0], ev["ts"], started[1]))
+
+def split_fixed(start, end, seconds):
+    # 분/시 롤업용: 고정 길이 버킷 경계에서 자른 [(버킷 시작, 초), ...]
+    pieces = []
+    while start < end:
+        bucket = start - start % seconds
+        stop = min(end, bucket + seconds)
+        pieces.append((bucket, stop - start))
+        start = stop
+    return pieces
+
+def minutes(seconds):
+    return round(seconds / 60.0, 2)
+
+def save(cur, open_stops, pieces, lines):
+    # pieces: [(line_id, start_ts, end_ts, date, shift, stop_reason), ...]
+    cur.executemany("""
+        INSERT INTO stop_intervals (line_id, start_ts, end_ts, date, shift, stop_reason)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, pieces)
+    cur.execute(f"DELETE FROM stop_open WHERE line_id IN ({','.join('?' * len(lines))})", lines)
+    cur.executemany(
+        "INSERT INTO stop_open (line_id, start_ts, stop_reason) VALUES (?, ?, ?)",
+        [(line_id, start_ts, reason) for line_id, (start_ts, reason) in open_stops.items()],
+    )
+
+def query_intervals(db, line_id, start, end):
+    # [start, end) 와 겹치는 조각을 구간에 맞게 잘라 반환
+    rows = db.execute("""
+        SELECT MAX(start_ts, ?) AS start_ts, MIN(end_ts, ?) AS end_ts, date, shift, stop_reason
+        FROM stop_intervals
+        WHERE line_id = ? AND start_ts < ? AND end_ts > ?
+        ORDER BY start_ts
+    """, (start, end, line_id, end, start)).fetchall()
+    return [dict(r) for r in rows]
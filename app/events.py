@@ -0,0 +1,96 @@
+import math
+import time
+from app import partitions
+from app.config import Config
+
+REQUIRED = ["device_id", "line_id", "event_type"]
+FIELDS = REQUIRED + ["station_id", "unit_id", "cycle_time", "defect_code", "stop_reason", "event_id"]
+
+INSERT_SQL = """
+    INSERT INTO raw_events
+    (ts, device_id, line_id, station_id, event_type, unit_id, cycle_time, defect_code, stop_reason)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def missing_fields(data):
+    return [k for k in REQUIRED if k not in data]
+
+def invalid_fields(data, now=None):
+    # SQLite 에 바인딩할 수 있는 스칼라만 허용. dict/list 값이나 필수 필드의 null 은
+    # executemany 에서 배치 전체를 실패시키므로 레코드 단위로 먼저 거른다
+    bad = [k for k in FIELDS if k in data and not isinstance(data[k], (str, int, float, type(None)))]
+    bad += [k for k in REQUIRED if k in data and data[k] is None]
+    if "cycle_time" not in bad and data.get("cycle_time") is not None and not valid_cycle_time(data["cycle_time"]):
+        bad.append("cycle_time")
+    if data.get("ts") is not None and not valid_ts(data["ts"], now):
+        bad.append("ts")
+    return bad
+
+def valid_cycle_time(ct):
+    # 음수/NaN/무한대는 사이클타임 평균·분산 집계를 망가뜨린다 (문자열은 SQLite 가 REAL 로 바꿔 넣음)
+    if isinstance(ct, str):
+        try:
+            ct = float(ct)
+        except ValueError:
+            return False
+    if isinstance(ct, bool) or not isinstance(ct, (int, float)):
+        return False
+    return math.isfinite(ct) and ct >= 0
+
+def valid_ts(ts, now=None):
+    # 장비가 기록한 발생 시각(epoch 초). 장비 시계 오차와 edge 큐 보관 기간 안쪽만 받는다
+    if isinstance(ts, bool) or not isinstance(ts, (int, float)) or not math.isfinite(ts):
+        return False
+    now = time.time() if now is None else now
+    return now - Config.CLIENT_TS_MAX_AGE_DAYS * 86400 <= ts <= now + Config.CLIENT_TS_MAX_SKEW_SEC
+
+def to_row(data, ts=None):
+    # 이벤트에 ts 가 있으면 발생 시각으로 쓰고, 없으면 서버 수신 시각 (invalid_fields 로 검증한 뒤 호출)
+    if data.get("ts") is not None:
+        ts = int(data["ts"])
+    return (
+        int(time.time()) if ts is None else ts,
+        data["device_id"],
+        data["line_id"],
+        data.get("station_id"),
+        data["event_type"],
+        data.get("unit_id"),
+        data.get("cycle_time"),
+        data.get("defect_code"),
+        data.get("stop_reason"),
+    )
+
+def dedupe_key(device_id, event_id):
+    # event_id 는 장비가 재전송해도 같은 값을 보내는 선택 필드. 장비마다 따로 매기는 값
+    # (카운터 등)일 수 있으므로 device_id 와 묶어서 중복을 판정한다
+    return None if event_id is None else (device_id, str(event_id))
+
+def dedupe_key_of(data):
+    return dedupe_key(data["device_id"], data.get("event_id"))
+
+def claim_event_ids(db, keys, ts=None):
+    # ingest_dedupe 에 처음 들어간 (device_id, event_id) 만 새 이벤트 (event_id 없으면 항상 새 이벤트)
+    # raw_events 적재와 같은 트랜잭션에서 커밋해야 중복 판정과 적재가 어긋나지 않는다
+    ts = int(time.time()) if ts is None else ts
+    fresh = []
+    for key in keys:
+        if key is None:
+            fresh.append(True)
+            continue
+        cur = db.execute(
+            "INSERT OR IGNORE INTO ingest_dedupe (device_id, event_id, created_ts) VALUES (?, ?, ?)", (*key, ts)
+        )
+        fresh.append(cur.rowcount == 1)
+    return fresh
+
+def insert_new_events(db, rows, keys, partition=None):
+    fresh = claim_event_ids(db, keys)
+    insert_events(db, [row for row, ok in zip(rows, fresh) if ok], partition)
+    return fresh
+
+def insert_events(db, rows, partition=None):
+    # partition 이 설정되면 ts 기준으로 기간별 raw_events 파티션에 나눠 적재
+    if partition:
+        partitions.insert_events(db, rows, partition)
+    else:
+        db.executemany(INSERT_SQL, rows)
@@ -0,0 +1,122 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from app.events import insert_new_events
+from app.metrics import DB_COMMIT_SECONDS, INGEST_BATCH_ROWS, INGEST_DROPPED_EVENTS
+from app.storage import connect
+
+# 검증된 이벤트를 큐에 모았다가 전용 writer 스레드가 한 트랜잭션으로 커밋
+class IngestBuffer:
+
+    def __init__(self, db_path, pragmas=None, partition=None, max_latency_ms=50, batch_size=500, max_queue=10000,
+                 seen=None):
+        self.db_path = db_path
+        # (device_id, event_id) 중복 LRU. 커밋이 끝난 뒤에만 채워야 기록 실패한 이벤트의 재전송을 중복으로 오판하지 않는다
+        self.seen = seen
+        self.pragmas = pragmas
+        self.partition = partition
+        self.max_latency = max_latency_ms / 1000.0
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, row, key=None):
+        try:
+            self.queue.put_nowait((row, key))
+            return True
+        except queue.Full:
+            return False
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+
+    def _next_batch(self):
+        try:
+            first = self.queue.get(timeout=self.max_latency)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _commit(self, conn, batch):
+        insert_new_events(conn, [row for row, _ in batch], [key for _, key in batch], self.partition)
+        with DB_COMMIT_SECONDS.labels("buffer").time():
+            conn.commit()
+        INGEST_BATCH_ROWS.labels("buffer").observe(len(batch))
+        if self.seen is not None:
+            for _, key in batch:
+                if key is not None:
+                    self.seen.put(key, True)
+
+    def _write(self, conn, batch):
+        # 잠금 같은 일시 오류는 배치 그대로 재시도
+        for attempt in range(3):
+            try:
+                self._commit(conn, batch)
+                return
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                print(f"[ingest-buffer] write failed ({e}), attempt={attempt + 1}")
+                time.sleep(0.1 * (attempt + 1))
+            except Exception as e:
+                conn.rollback()
+                print(f"[ingest-buffer] batch rejected ({e!r}), writing rows one at a time")
+                break
+
+        # 이미 202 로 응답한 이벤트이므로 한 건씩 다시 넣어 문제 행만 버린다
+        for item in batch:
+            try:
+                self._commit(conn, [item])
+            except Exception:
+                conn.rollback()
+                INGEST_DROPPED_EVENTS.labels("buffer").inc()
+
+    def _run(self):
+        conn = connect(self.db_path, self.pragmas)
+        try:
+            while not self._stop.is_set():
+                # writer 스레드가 죽으면 이후 요청은 202 를 받고도 기록되지 않으므로 어떤 오류에도 계속 돈다
+                try:
+                    batch = self._next_batch()
+                    if batch:
+                        self._write(conn, batch)
+                except Exception as e:
+                    print(f"[ingest-buffer] writer error ({e!r})")
+            # 종료 시 큐에 남은 이벤트까지 모두 커밋
+            batch = self._drain()
+            while batch:
+                self._write(conn, batch[:self.batch_size])
+                batch = batch[self.batch_size:]
+        finally:
+            conn.close()
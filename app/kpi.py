@@ -0,0 +1,18 @@
+import math
+
+def cycle_stats(count, total, sumsq):
+    # summary_shift 의 합/제곱합 상태로부터 평균, 모표준편차 계산
+    if not count:
+        return None, None
+    avg = total / count
+    var = max(sumsq / count - avg * avg, 0.0)
+    return avg, math.sqrt(var)
+
+def with_cycle_stats(row):
+    r = dict(row)
+    avg, std = cycle_stats(r.pop("ct_count"), r.pop("ct_sum"), r.pop("ct_sumsq"))
+    r["avg_cycle_time"] = None if avg is None else round(avg, 3)
+    r["stddev_cycle_time"] = None if std is None else round(std, 3)
+    r["min_cycle_time"] = r.pop("ct_min")
+    r["max_cycle_time"] = r.pop("ct_max")
+    return r
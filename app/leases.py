@@ -0,0 +1,137 @@
+import math
+import time
+
+# 워커는 라인 단위로 리스를 잡고, 라인마다 "summary_shift:<line_id>" 체크포인트를 둔다
+# 리스 조회/획득/검증은 모두 BEGIN IMMEDIATE 쓰기 트랜잭션 안에서 호출해야 서로 겹치지 않는다
+CHECKPOINT_PREFIX = "summary_shift:"
+DISCOVERY = "line_discovery"
+# 샤딩 이전의 단일 체크포인트 (있으면 라인별 체크포인트의 시작점으로 이관)
+LEGACY_CHECKPOINT = "summary_shift"
+
+def checkpoint_name(line_id):
+    return CHECKPOINT_PREFIX + line_id
+
+def _get(cur, name):
+    row = cur.execute("SELECT last_event_id FROM worker_checkpoint WHERE name=?", (name,)).fetchone()
+    return None if row is None else int(row[0])
+
+def _set(cur, name, last_id, now):
+    cur.execute("""
+        INSERT INTO worker_checkpoint (name, last_event_id, updated_ts)
+        VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            last_event_id=excluded.last_event_id,
+            updated_ts=excluded.updated_ts
+    """, (name, last_id, int(now)))
+
+def _add_lines(cur, lines, start_id, now):
+    for line_id in lines:
+        cur.execute("INSERT OR IGNORE INTO worker_lease (line_id) VALUES (?)", (line_id,))
+        if _get(cur, checkpoint_name(line_id)) is None:
+            _set(cur, checkpoint_name(line_id), start_id, now)
+
+def discover_lines(cur, legacy_start):
+    # 지난 발견 지점 이후 새로 나타난 line_id 를 리스 테이블에 등록하고 현재 MAX(id) 를 돌려준다
+    # 새 라인의 이벤트는 모두 발견 지점 뒤에 있으므로 체크포인트는 발견 지점에서 시작
+    now = time.time()
+    hi = cur.execute("SELECT COALESCE(MAX(id), 0) FROM raw_events").fetchone()[0]
+    seen = _get(cur, DISCOVERY)
+    if seen is None:
+        # 최초 1회: 전체 라인을 기존(단일 워커) 체크포인트에서 시작하도록 등록
+        start = _get(cur, LEGACY_CHECKPOINT)
+        if start is None:
+            start = legacy_start(cur)
+        lines = [r[0] for r in cur.execute("SELECT DISTINCT line_id FROM raw_events WHERE id <= ?", (hi,))]
+        _add_lines(cur, lines, start, now)
+        cur.execute("DELETE FROM worker_checkpoint WHERE name=?", (LEGACY_CHECKPOINT,))
+    elif hi > seen:
+        lines = [r[0] for r in cur.execute(
+            "SELECT DISTINCT line_id FROM raw_events WHERE id > ? AND id <= ?", (seen, hi)
+        )]
+        _add_lines(cur, lines, seen, now)
+    if seen is None or hi > seen:
+        _set(cur, DISCOVERY, hi, now)
+    return hi
+
+def claim(cur, owner, ttl):
+    # 살아 있는 워커 수로 나눈 몫만큼 라인을 갖는다. 몫보다 많이 가진 워커는 남는 라인을 내놓아
+    # 새로 뜬 워커가 리스 만료를 기다리지 않고 가져갈 수 있게 한다
+    now = time.time()
+    cur.execute("""
+        INSERT INTO worker_node (owner, expires_ts) VALUES (?, ?)
+        ON CONFLICT(owner) DO UPDATE SET expires_ts=excluded.expires_ts
+    """, (owner, now + ttl))
+    cur.execute("DELETE FROM worker_node WHERE expires_ts <= ?", (now,))
+    cur.execute("UPDATE worker_lease SET expires_ts=? WHERE owner=?", (now + ttl, owner))
+    total = cur.execute("SELECT COUNT(*) FROM worker_lease").fetchone()[0]
+    live = cur.execute("SELECT COUNT(*) FROM worker_node").fetchone()[0]
+    share = math.ceil(total / live) if total else 0
+
+    mine = [r[0] for r in cur.execute(
+        "SELECT line_id FROM worker_lease WHERE owner=? ORDER BY line_id", (owner,)
+    )]
+    if len(mine) > share:
+        for line_id in mine[share:]:
+            cur.execute("UPDATE worker_lease SET owner=NULL, expires_ts=0 WHERE line_id=?", (line_id,))
+        mine = mine[:share]
+    elif len(mine) < share:
+        free = [r[0] for r in cur.execute("""
+            SELECT line_id FROM worker_lease
+            WHERE owner IS NULL OR expires_ts <= ?
+            ORDER BY line_id LIMIT ?
+        """, (now, share - len(mine)))]
+        for line_id in free:
+            cur.execute("UPDATE worker_lease SET owner=?, expires_ts=? WHERE line_id=?", (owner, now + ttl, line_id))
+        mine += free
+    return mine
+
+def line_checkpoint(cur, line_id):
+    # 아직 워커가 등록하지 않은 라인이면 None
+    return _get(cur, checkpoint_name(line_id))
+
+def load_checkpoints(cur, lines):
+    return {line_id: _get(cur, checkpoint_name(line_id)) or 0 for line_id in lines}
+
+def verify(cur, owner, start):
+    # 커밋 직전 (쓰기 트랜잭션 안에서) 리스가 아직 내 것이고 그 사이 다른 워커가 체크포인트를
+    # 옮기지 않았는지 확인. 하나라도 어긋나면 이번 tick 전체를 버린다
+    now = time.time()
+    for line_id, last_id in start.items():
+        row = cur.execute("SELECT owner, expires_ts FROM worker_lease WHERE line_id=?", (line_id,)).fetchone()
+        if row is None or row[0] != owner or row[1] <= now:
+            return False
+        if (_get(cur, checkpoint_name(line_id)) or 0) != last_id:
+            return False
+    return True
+
+def save_checkpoints(cur, start, last_id):
+    # 다른 워커에게서 넘겨받아 체크포인트가 이미 last_id 보다 앞선 라인은 그대로 둔다
+    now = time.time()
+    for line_id, first in start.items():
+        _set(cur, checkpoint_name(line_id), max(first, last_id), now)
+
+def release(cur, owner):
+    cur.execute("UPDATE worker_lease SET owner=NULL, expires_ts=0 WHERE owner=?", (owner,))
+    cur.execute("DELETE FROM worker_node WHERE owner=?", (owner,))
+
+def watermark(db):
+    # summary_shift 버전: 라인별 체크포인트와 재계산 세대 번호는 증가만 하므로 합이 곧 버전
+    row = db.execute("""
+        SELECT (SELECT COALESCE(SUM(last_event_id), 0) FROM worker_checkpoint WHERE name GLOB ?)
+             + (SELECT COALESCE(MAX(generation), 0) FROM summary_generation)
+    """, (CHECKPOINT_PREFIX + "*",)).fetchone()
+    return int(row[0])
+
+def bump_generation(cur):
+    cur.execute("""
+        INSERT INTO summary_generation (id, generation) VALUES (1, 1)
+        ON CONFLICT(id) DO UPDATE SET generation=generation + 1
+    """)
+
+def aggregated_through(db):
+    # 모든 라인이 반영을 마친 마지막 이벤트 id (지연 지표, 파티션 보존 판단용)
+    row = db.execute(
+        "SELECT MIN(last_event_id) FROM worker_checkpoint WHERE name GLOB ?",
+        (CHECKPOINT_PREFIX + "*",),
+    ).fetchone()
+    return int(row[0] or 0)
@@ -0,0 +1,113 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from app.kpi import with_cycle_stats
+from app.storage import connect
+
+# summary_changes 를 한 스레드가 폴링하고, 접속한 모든 대시보드에 메모리에서 나눠준다
+# 화면 수와 무관하게 DB 읽기는 폴링 주기당 한 번
+class LiveHub:
+    def __init__(self, db_path, pragmas=None, poll_ms=1000, subscriber_queue=256):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.poll = poll_ms / 1000.0
+        self.subscriber_queue = subscriber_queue
+        self._subs = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.subscriber_queue)
+        with self._lock:
+            self._subs.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-hub", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subs.discard(q)
+
+    def publish(self, message):
+        with self._lock:
+            subs = list(self._subs)
+        for q in subs:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # 느린 화면은 밀린 증분을 버리고 전체 재조회하도록 알린다
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                q.put_nowait({"event": "resync", "data": {}})
+
+    def _run(self):
+        # 폴링 스레드가 죽으면 이후 접속한 화면도 영영 증분을 받지 못하므로, 오류는 기록하고 다시 연결해 계속 돈다
+        conn = None
+        last_seq = None
+        while True:
+            try:
+                if conn is None:
+                    conn = connect(self.db_path, self.pragmas)
+                    conn.row_factory = sqlite3.Row
+                if last_seq is None:
+                    last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM summary_changes").fetchone()[0]
+                time.sleep(self.poll)
+                rows = self._poll(conn, last_seq)
+            except Exception as e:
+                print(f"[live-hub] poll failed ({e!r}), reconnecting")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    conn = None
+                time.sleep(self.poll)
+                continue
+            for r in rows:
+                last_seq = r["seq"]
+                self.publish({"event": "bucket", "id": r["seq"], "data": _bucket_message(r)})
+
+    def _poll(self, conn, last_seq):
+        rows = conn.execute("""
+            SELECT c.seq, c.date, c.shift, c.line_id,
+                   c.produced_delta, c.defect_delta, c.stop_delta,
+                   s.produced_count, s.defect_count, s.stop_minutes,
+                   s.ct_count, s.ct_sum, s.ct_sumsq, s.ct_min, s.ct_max,
+                   s.last_event_ts
+            FROM summary_changes c
+            LEFT JOIN summary_shift s
+              ON s.date = c.date AND s.shift = c.shift AND s.line_id = c.line_id
+            WHERE c.seq > ?
+            ORDER BY c.seq
+        """, (last_seq,)).fetchall()
+        if conn.in_transaction:
+            conn.rollback()
+        return rows
+
+def _bucket_message(r):
+    row = with_cycle_stats({
+        k: r[k] for k in (
+            "date", "shift", "line_id", "produced_count", "defect_count", "stop_minutes",
+            "ct_count", "ct_sum", "ct_sumsq", "ct_min", "ct_max", "last_event_ts",
+        )
+    })
+    delta = {
+        "produced_count": r["produced_delta"],
+        "defect_count": r["defect_delta"],
+        "stop_minutes": r["stop_delta"],
+    }
+    return {"row": row, "delta": delta}
+
+def format_sse(message):
+    out = ""
+    if "id" in message:
+        out += f"id: {message['id']}\n"
+    out += f"event: {message['event']}\n"
+    out += f"data: {json.dumps(message['data'], ensure_ascii=False)}\n\n"
+    return out
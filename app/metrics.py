@@ -0,0 +1,199 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# prometheus_client 없이 쓰는 최소한의 프로세스 내 메트릭 레지스트리 (text exposition format)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _default(self):
+        return self.labels()
+
+    def _label_str(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._children.items())
+        if not items and not self.labelnames:
+            items = [((), self._new_child())]
+        for key, child in items:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.fn = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, fn):
+        self.fn = fn
+
+    def get(self):
+        return self.fn() if self.fn is not None else self.value
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{self._label_str(key)} {child.get()}"]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, fn):
+        self._default().set_function(fn)
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        lines = []
+        running = 0
+        for bound, n in zip(self.buckets, counts):
+            running += n
+            lines.append(f"{self.name}_bucket{self._label_str(key, [('le', bound)])} {running}")
+        lines.append(f"{self.name}_bucket{self._label_str(key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{self._label_str(key)} {total}")
+        lines.append(f"{self.name}_count{self._label_str(key)} {count}")
+        return lines
+
+REGISTRY = []
+
+INGEST_REQUEST_SECONDS = Histogram(
+    REGISTRY, "ingest_request_seconds", "Ingest request latency", ["endpoint"])
+INGEST_BATCH_ROWS = Histogram(
+    REGISTRY, "ingest_batch_rows", "Rows written per ingest transaction", ["path"], buckets=ROWS_BUCKETS)
+DB_COMMIT_SECONDS = Histogram(
+    REGISTRY, "db_commit_seconds", "Write transaction commit duration", ["component"])
+INGEST_DROPPED_EVENTS = Counter(
+    REGISTRY, "ingest_dropped_events_total", "Accepted events that could not be written", ["path"])
+INGEST_QUEUE_DEPTH = Gauge(
+    REGISTRY, "ingest_queue_depth", "Events waiting in the group-commit buffer")
+WORKER_TICK_SECONDS = Histogram(
+    REGISTRY, "worker_tick_seconds", "Aggregation worker tick duration")
+WORKER_PROCESSED_EVENTS = Counter(
+    REGISTRY, "worker_processed_events_total", "raw_events rows folded by the worker")
+WORKER_LAG_SECONDS = Gauge(
+    REGISTRY, "worker_lag_seconds", "Newest raw_events.ts minus ts of the last aggregated event")
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def worker_lag(conn, last_event_id):
+    newest, done, oldest = conn.execute("""
+        SELECT (SELECT MAX(ts) FROM raw_events),
+               (SELECT ts FROM raw_events WHERE id = ?),
+               (SELECT MIN(ts) FROM raw_events)
+    """, (last_event_id,)).fetchone()
+    if newest is None:
+        return 0
+    if done is None:
+        # 아직 아무것도 집계 안 됨 / 체크포인트 행이 보존 기간으로 삭제됨
+        done = oldest if last_event_id == 0 else newest
+    return max(newest - done, 0)
+
+def start_http_server(port, addr="0.0.0.0"):
+    # 워커처럼 Flask 가 없는 프로세스용 /metrics 서버
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
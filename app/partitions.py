@@ -0,0 +1,192 @@
+import time
+from datetime import date, datetime, timedelta
+
+# raw_events 기간별 파티션: raw_events_pYYYYMMDD 테이블 + 전체를 잇는 raw_events 뷰
+PREFIX = "raw_events_p"
+PERIODS = ("day", "week", "month")
+
+COLUMNS = "id, ts, device_id, line_id, station_id, event_type, unit_id, cycle_time, defect_code, stop_reason"
+
+PARTITION_DDL = """
+CREATE TABLE IF NOT EXISTS {name} (
+  id INTEGER PRIMARY KEY,
+  ts INTEGER NOT NULL,
+  device_id TEXT NOT NULL,
+  line_id TEXT NOT NULL,
+  station_id TEXT,
+  event_type TEXT NOT NULL,
+  unit_id TEXT,
+  cycle_time REAL,
+  defect_code TEXT,
+  stop_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_{name}_ts ON {name}(ts);
+CREATE INDEX IF NOT EXISTS idx_{name}_line_ts ON {name}(line_id, ts);
+CREATE INDEX IF NOT EXISTS idx_{name}_unit ON {name}(unit_id);
+"""
+
+def period_start(d: date, period: str) -> date:
+    if period == "day":
+        return d
+    if period == "week":
+        return d - timedelta(days=d.weekday())
+    if period == "month":
+        return d.replace(day=1)
+    raise ValueError(f"unknown partition period: {period}")
+
+def next_period(start: date, period: str) -> date:
+    if period == "day":
+        return start + timedelta(days=1)
+    if period == "week":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+def partition_name(ts, period):
+    start = period_start(datetime.fromtimestamp(ts).date(), period)
+    return f"{PREFIX}{start.strftime('%Y%m%d')}"
+
+def partition_start(name) -> date:
+    return datetime.strptime(name[len(PREFIX):], "%Y%m%d").date()
+
+def is_partitioned(conn):
+    row = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name='raw_events'"
+    ).fetchone()
+    return row is not None and row[0] == "view"
+
+def list_partitions(conn):
+    rows = conn.execute(f"""
+        SELECT name FROM sqlite_master
+        WHERE type='table' AND name GLOB '{PREFIX}[0-9]*'
+        ORDER BY name
+    """).fetchall()
+    return [r[0] for r in rows]
+
+def _rebuild_view(conn):
+    names = list_partitions(conn)
+    conn.execute("DROP VIEW IF EXISTS raw_events")
+    conn.execute(
+        "CREATE VIEW raw_events AS "
+        + " UNION ALL ".join(f"SELECT {COLUMNS} FROM {n}" for n in names)
+    )
+
+def _create_partition(conn, name):
+    for stmt in PARTITION_DDL.format(name=name).split(";"):
+        if stmt.strip():
+            conn.execute(stmt)
+
+def _ddl(conn, fn):
+    # 뷰 교체 중에 다른 연결이 raw_events 없는 스키마를 보지 않도록 한 트랜잭션으로 처리
+    conn.execute("SAVEPOINT partition_ddl")
+    try:
+        fn()
+    except Exception:
+        conn.execute("ROLLBACK TO partition_ddl")
+        conn.execute("RELEASE partition_ddl")
+        raise
+    conn.execute("RELEASE partition_ddl")
+
+def ensure_partitions(conn, names):
+    names = set(names)
+    placeholders = ",".join("?" * len(names))
+    existing = {r[0] for r in conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type='table' AND name IN ({placeholders})",
+        tuple(names),
+    )}
+    missing = sorted(names - existing)
+    if not missing:
+        return []
+
+    def create():
+        for name in missing:
+            _create_partition(conn, name)
+        _rebuild_view(conn)
+
+    _ddl(conn, create)
+    return missing
+
+def reserve_ids(conn, n):
+    # 파티션이 달라도 id 는 적재 순서대로 단조 증가해야 워커 체크포인트가 유효하다
+    end = conn.execute(
+        "UPDATE raw_events_seq SET next_id = next_id + ? RETURNING next_id", (n,)
+    ).fetchone()[0]
+    return end - n
+
+def insert_events(conn, rows, period):
+    by_partition = {}
+    for row in rows:
+        by_partition.setdefault(partition_name(row[0], period), []).append(row)
+    ensure_partitions(conn, by_partition)
+
+    first_id = reserve_ids(conn, len(rows))
+    for name, part_rows in by_partition.items():
+        conn.executemany(
+            f"INSERT INTO {name} ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(first_id + i, *row) for i, row in enumerate(part_rows)],
+        )
+        first_id += len(part_rows)
+
+def enable(conn, period):
+    if period not in PERIODS:
+        raise ValueError(f"unknown partition period: {period}")
+    if is_partitioned(conn):
+        return
+
+    def migrate():
+        # 기존 단일 테이블 행을 id 그대로 기간별 파티션으로 옮긴다
+        max_id = conn.execute("SELECT MAX(id) FROM raw_events").fetchone()[0]
+        days = conn.execute(
+            "SELECT DISTINCT date(ts, 'unixepoch', 'localtime') FROM raw_events"
+        ).fetchall()
+        starts = sorted({period_start(date.fromisoformat(r[0]), period) for r in days})
+        names = []
+        for start in starts:
+            name = f"{PREFIX}{start.strftime('%Y%m%d')}"
+            lo = int(time.mktime(start.timetuple()))
+            hi = int(time.mktime(next_period(start, period).timetuple()))
+            _create_partition(conn, name)
+            conn.execute(
+                f"INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM raw_events WHERE ts >= ? AND ts < ?",
+                (lo, hi),
+            )
+            names.append(name)
+
+        current = partition_name(int(time.time()), period)
+        if current not in names:
+            _create_partition(conn, current)
+
+        conn.execute("CREATE TABLE IF NOT EXISTS raw_events_seq (next_id INTEGER NOT NULL)")
+        conn.execute("DELETE FROM raw_events_seq")
+        conn.execute("INSERT INTO raw_events_seq (next_id) VALUES (?)", ((max_id or 0) + 1,))
+        conn.execute("DROP TABLE raw_events")
+        _rebuild_view(conn)
+
+    _ddl(conn, migrate)
+
+def drop_before(conn, cutoff: date, period, max_id=None):
+    # cutoff 이전에 끝나는 파티션만 통째로 DROP (DELETE 없음)
+    # 발생 시각이 지난 이벤트는 옛 파티션에 새 id 로 들어오므로, 쓰기 잠금을 먼저 잡은 뒤 max_id 를 검사해야
+    # 검사와 DROP 사이에 들어온 미집계 이벤트를 함께 지우지 않는다 (커밋은 호출한 쪽에서)
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    victims = []
+    for name in list_partitions(conn):
+        if next_period(partition_start(name), period) > cutoff:
+            continue
+        if max_id is not None:
+            top = conn.execute(f"SELECT MAX(id) FROM {name}").fetchone()[0]
+            if top is not None and top > max_id:
+                continue
+        victims.append(name)
+
+    remaining = len(list_partitions(conn)) - len(victims)
+    if not victims or remaining == 0:
+        return []
+
+    def drop():
+        for name in victims:
+            conn.execute(f"DROP TABLE {name}")
+        _rebuild_view(conn)
+
+    _ddl(conn, drop)
+    return victims
@@ -0,0 +1,120 @@
+import time
+from datetime import datetime
+
+# 분/시 롤업은 워커가 이벤트에서 직접, 일 롤업은 시 롤업을 합산해 유지
+RESOLUTIONS = [("day", 86400), ("hour", 3600), ("minute", 60)]
+
+STATE_COLUMNS = "produced_count, defect_count, stop_minutes, ct_count, ct_sum, ct_sumsq, ct_min, ct_max"
+
+def bucket_start(ts, seconds):
+    return ts - ts % seconds
+
+def local_midnight(ts):
+    d = datetime.fromtimestamp(ts).date()
+    return int(time.mktime(d.timetuple()))
+
+def apply_deltas(cur, resolution, deltas):
+    # deltas: {(bucket_ts, line_id, station_id): [produced, defect, stopm, ct_count, ct_sum, ct_sumsq, ct_min, ct_max, ...]}
+    cur.executemany(f"""
+        INSERT INTO rollup_{resolution}
+        (bucket_ts, line_id, station_id, {STATE_COLUMNS})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(line_id, station_id, bucket_ts) DO UPDATE SET
+            produced_count=produced_count + excluded.produced_count,
+            defect_count=defect_count + excluded.defect_count,
+            stop_minutes=stop_minutes + excluded.stop_minutes,
+            ct_count=ct_count + excluded.ct_count,
+            ct_sum=ct_sum + excluded.ct_sum,
+            ct_sumsq=ct_sumsq + excluded.ct_sumsq,
+            ct_min=MIN(COALESCE(ct_min, excluded.ct_min), COALESCE(excluded.ct_min, ct_min)),
+            ct_max=MAX(COALESCE(ct_max, excluded.ct_max), COALESCE(excluded.ct_max, ct_max))
+    """, [(*key, *d[:8]) for key, d in deltas.items()])
+
+def refresh_days(cur, hour_keys):
+    # 바뀐 시 롤업이 속한 (로컬 일자, line, station) 만 다시 합산
+    # 시 버킷은 epoch 정시 기준이라 UTC 와 정수 시간 차가 아닌 시간대(+05:30 등)에서는 자정을 걸친다.
+    # 하루 안에 온전히 든 시 버킷에 양 끝 자투리 시간은 분 버킷으로 채운다 (정수 시간대면 자투리 없음)
+    days = {(local_midnight(ts), line_id, station_id) for ts, line_id, station_id in hour_keys}
+    days |= {(local_midnight(ts + 3599), line_id, station_id) for ts, line_id, station_id in hour_keys}
+    params = []
+    for day, line_id, station_id in days:
+        end = local_midnight(day + 90000)
+        h_lo, h_hi = -(-day // 3600) * 3600, end - end % 3600
+        params.append((day, line_id, station_id, h_lo, h_hi,
+                       line_id, station_id, day, h_lo, h_hi, end))
+    cur.executemany(f"""
+        INSERT OR REPLACE INTO rollup_day
+        (bucket_ts, line_id, station_id, {STATE_COLUMNS})
+        SELECT ?, line_id, station_id,
+               SUM(produced_count), SUM(defect_count), SUM(stop_minutes),
+               SUM(ct_count), SUM(ct_sum), SUM(ct_sumsq), MIN(ct_min), MAX(ct_max)
+        FROM (
+            SELECT line_id, station_id, {STATE_COLUMNS} FROM rollup_hour
+            WHERE line_id=? AND station_id=? AND bucket_ts >= ? AND bucket_ts < ?
+            UNION ALL
+            SELECT line_id, station_id, {STATE_COLUMNS} FROM rollup_minute
+            WHERE line_id=? AND station_id=?
+              AND ((bucket_ts >= ? AND bucket_ts < ?) OR (bucket_ts >= ? AND bucket_ts < ?))
+        )
+        GROUP BY line_id, station_id
+    """, params)
+
+def prune_minutes(cur, minute_keys, retention_days):
+    # 분 롤업은 최근 retention_days 일만 둔다 (그보다 긴 구간은 시/일 롤업으로 조회).
+    # 이번 tick 에 바뀐 (line, station) 만 PK 범위로 지우므로 테이블 전체를 훑지 않는다
+    cutoff = int(time.time()) - retention_days * 86400
+    pairs = {(line_id, station_id) for _, line_id, station_id in minute_keys}
+    cur.executemany(
+        "DELETE FROM rollup_minute WHERE line_id=? AND station_id=? AND bucket_ts < ?",
+        [(line_id, station_id, cutoff) for line_id, station_id in pairs],
+    )
+
+def _aligned(ts, name, seconds):
+    if name == "day":
+        return local_midnight(ts) == ts
+    return ts % seconds == 0
+
+def pick_resolution(start, end, step):
+    # 구간 경계와 step 을 모두 만족하는 가장 굵은 해상도
+    for name, seconds in RESOLUTIONS:
+        if step % seconds == 0 and _aligned(start, name, seconds) and _aligned(end, name, seconds):
+            return name, seconds
+    return None
+
+def query_series(db, line_id, start, end, step, station_id=None):
+    picked = pick_resolution(start, end, step)
+    if picked is None:
+        raise ValueError("from/to/step must be aligned to at least one minute")
+    resolution, _ = picked
+
+    where = "line_id = ? AND bucket_ts >= ? AND bucket_ts < ?"
+    params = [line_id, start, end]
+    if station_id is not None:
+        where += " AND station_id = ?"
+        params.append(station_id)
+
+    # 일 롤업은 DST 로 하루가 23/25시간일 수 있어 반나절 보정 후 묶고 실제 자정을 라벨로 쓴다
+    start, step = int(start), int(step)
+    if resolution == "day":
+        group = f"(bucket_ts - {start} + 43200) / {step}"
+        label = "MIN(bucket_ts)"
+    else:
+        group = f"(bucket_ts - {start}) / {step}"
+        label = f"{start} + ({group}) * {step}"
+
+    rows = db.execute(f"""
+        SELECT {label} AS ts, {group} AS grp,
+               SUM(produced_count) AS produced_count,
+               SUM(defect_count) AS defect_count,
+               SUM(stop_minutes) AS stop_minutes,
+               SUM(ct_count) AS ct_count,
+               SUM(ct_sum) AS ct_sum,
+               SUM(ct_sumsq) AS ct_sumsq,
+               MIN(ct_min) AS ct_min,
+               MAX(ct_max) AS ct_max
+        FROM rollup_{resolution}
+        WHERE {where}
+        GROUP BY grp
+        ORDER BY grp
+    """, params).fetchall()
+    return resolution, rows
@@ -1,37 +1,170 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, g
 from app.db import get_db
+from app import wire
+from app.events import dedupe_key_of, insert_new_events, invalid_fields, missing_fields, to_row
+from app.metrics import DB_COMMIT_SECONDS, INGEST_BATCH_ROWS, INGEST_REQUEST_SECONDS
+import gzip
+import json
 import time
+import zlib
 
 bp = Blueprint("ingest", __name__)
 
+@bp.before_request
+def start_timer():
+    g.ingest_t0 = time.perf_counter()
+
+@bp.after_request
+def observe_latency(response):
+    INGEST_REQUEST_SECONDS.labels(request.endpoint).observe(time.perf_counter() - g.ingest_t0)
+    return response
+
 @bp.route("/events", methods=["POST"])
 def ingest_event():
-    data = request.get_json(silent=True) or {}
+    if wire.is_binary(request.content_type):
+        try:
+            items = wire.decode(request.get_data(), int(time.time()))
+        except ValueError as e:
+            return jsonify({"ok": False, "error": f"invalid body: {e}"}), 400
+        if len(items) != 1:
+            return jsonify({"ok": False, "error": "expected exactly one event (use /api/events/batch)"}), 400
+        if isinstance(items[0], dict):
+            return jsonify({"ok": False, "invalid": items[0]["invalid"]}), 400
+        row, key = items[0]
+    else:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            data = {}
+
+        missing = missing_fields(data)
+        if missing:
+            return jsonify({"ok": False, "missing": missing}), 400
+        invalid = invalid_fields(data)
+        if invalid:
+            return jsonify({"ok": False, "invalid": invalid}), 400
+        row, key = to_row(data), dedupe_key_of(data)
+
+    # 재전송은 대부분 직후에 오므로 메모리 LRU 에서 DB 접근 없이 응답
+    seen = current_app.extensions["dedupe_cache"]
+    if key is not None and seen.get(key):
+        return jsonify({"ok": True, "duplicate": True})
 
-    required = ["device_id", "line_id", "event_type"]
-    missing = [k for k in required if k not in data]
-    if missing:
-        return jsonify({"ok": False, "missing": missing}), 400
+    buf = current_app.extensions.get("ingest_buffer")
+    if buf is not None:
+        if not buf.submit(row, key):
+            return jsonify({"ok": False, "error": "ingest queue full"}), 503, {"Retry-After": "1"}
+        # LRU 는 writer 가 커밋한 뒤 채운다
+        return jsonify({"ok": True, "queued": True}), 202
 
     db = get_db()
-    db.execute(
-        """
-        INSERT INTO raw_events
-        (ts, device_id, line_id, station_id, event_type, unit_id, cycle_time, defect_code, stop_reason)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            int(time.time()),
-            data["device_id"],
-            data["line_id"],
-            data.get("station_id"),
-            data["event_type"],
-            data.get("unit_id"),
-            data.get("cycle_time"),
-            data.get("defect_code"),
-            data.get("stop_reason"),
-        )
-    )
-    db.commit()
+    fresh = insert_new_events(db, [row], [key], current_app.config["RAW_EVENTS_PARTITION"])[0]
+    with DB_COMMIT_SECONDS.labels("api").time():
+        db.commit()
+    if key is not None:
+        seen.put(key, True)
+    if not fresh:
+        return jsonify({"ok": True, "duplicate": True})
+    INGEST_BATCH_ROWS.labels("single").observe(1)
 
     return jsonify({"ok": True})
+
+def parse_batch(body, content_type):
+    # JSON 배열 또는 NDJSON(한 줄에 이벤트 하나)
+    text = body.decode("utf-8")
+    if "ndjson" not in content_type and text.lstrip().startswith("["):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("expected a JSON array")
+        return records
+
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            records.append(None)
+    return records
+
+def json_items(records, ts):
+    # 레코드마다 (insert 튜플, 중복 판정 키) 또는 거부 결과 dict
+    for i, data in enumerate(records):
+        if not isinstance(data, dict):
+            yield {"index": i, "ok": False, "error": "invalid_record"}
+            continue
+        missing = missing_fields(data)
+        if missing:
+            yield {"index": i, "ok": False, "missing": missing}
+            continue
+        invalid = invalid_fields(data, ts)
+        if invalid:
+            yield {"index": i, "ok": False, "error": "invalid_record", "invalid": invalid}
+            continue
+        yield to_row(data, ts), dedupe_key_of(data)
+
+# decode_batch 가 본문 형식 오류로 내는 예외들 (400 으로 응답)
+BATCH_BODY_ERRORS = (ValueError, OSError, EOFError, zlib.error)
+
+def decode_batch(body, content_type, content_encoding, ts):
+    # edge 에이전트는 묶음을 gzip 으로 압축해 보낸다
+    if content_encoding == "gzip":
+        body = gzip.decompress(body)
+    # 바이너리 형식은 필수 필드가 형식상 항상 있고, 값 검증은 wire.decode 가 컬럼 단위로 한다
+    if wire.is_binary(content_type):
+        return wire.decode(body, ts)
+    return list(json_items(parse_batch(body, content_type or ""), ts))
+
+def batch_summary(results, duplicates):
+    accepted = sum(1 for r in results if r["ok"] and not r.get("duplicate"))
+    return {
+        "ok": True,
+        "accepted": accepted,
+        "duplicates": duplicates,
+        "rejected": len(results) - accepted - duplicates,
+        "results": results,
+    }
+
+@bp.route("/events/batch", methods=["POST"])
+def ingest_batch():
+    ts = int(time.time())
+    try:
+        items = decode_batch(request.get_data(), request.content_type, request.content_encoding, ts)
+    except BATCH_BODY_ERRORS as e:
+        return jsonify({"ok": False, "error": f"invalid body: {e}"}), 400
+
+    seen = current_app.extensions["dedupe_cache"]
+    rows = []
+    keys = []
+    results = []
+    duplicates = 0
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            results.append(item)
+            continue
+        row, key = item
+        if key is not None and seen.get(key):
+            results.append({"index": i, "ok": True, "duplicate": True})
+            duplicates += 1
+            continue
+        rows.append(row)
+        keys.append(key)
+        results.append({"index": i, "ok": True})
+
+    if rows:
+        db = get_db()
+        fresh = insert_new_events(db, rows, keys, current_app.config["RAW_EVENTS_PARTITION"])
+        with DB_COMMIT_SECONDS.labels("api").time():
+            db.commit()
+        INGEST_BATCH_ROWS.labels("batch").observe(sum(fresh))
+
+        # results 중 적재 대상이었던 항목에 DB 판정 결과를 반영
+        pending = [r for r in results if r["ok"] and not r.get("duplicate")]
+        for r, key, ok in zip(pending, keys, fresh):
+            if key is not None:
+                seen.put(key, True)
+            if not ok:
+                r["duplicate"] = True
+                duplicates += 1
+
+    return jsonify(batch_summary(results, duplicates))
@@ -0,0 +1,12 @@
+from flask import Blueprint, Response
+from app.db import get_db
+from app.metrics import WORKER_LAG_SECONDS, render, worker_lag
+from app.leases import aggregated_through
+
+bp = Blueprint("metrics", __name__)
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    db = get_db()
+    WORKER_LAG_SECONDS.set(worker_lag(db, aggregated_through(db)))
+    return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -1,23 +1,174 @@
-from flask import Blueprint, jsonify, request
+import json
+import queue
+from datetime import date, datetime
+from flask import Blueprint, Response, jsonify, request, current_app
 from app.db import get_db
+from app.kpi import with_cycle_stats
+from app import archive, downtime, leases, rollups, stations
+from app.live import format_sse
+from app.shifts import from_spec
 
 bp = Blueprint("query", __name__)
 
+def summary_watermark(db):
+    # summary_shift 는 워커가 커밋할 때만 바뀌고 그때마다 라인별 체크포인트가 늘어나므로 그 합이 곧 버전
+    return leases.watermark(db)
+
 @bp.route("/kpi/today", methods=["GET"])
 def kpi_today():
     db = get_db()
 
-    date = request.args.get("date")
-    if not date:
-        date = db.execute("SELECT date('now','localtime') AS d").fetchone()["d"]
+    date = request.args.get("date") or datetime.now().strftime("%Y-%m-%d")
+    watermark = summary_watermark(db)
+    if request.if_none_match.contains(kpi_etag(date, watermark)):
+        return Response(status=304, headers=kpi_headers(date, watermark))
+
+    cache = current_app.extensions["kpi_cache"]
+    body = cache.get((date, watermark))
+    if body is None:
+        # watermark 와 행을 같은 읽기 스냅샷에서 가져와야 캐시 키와 내용이 어긋나지 않는다
+        db.execute("BEGIN")
+        try:
+            watermark = summary_watermark(db)
+            body = json.dumps(load_kpi_rows(db, date), ensure_ascii=False)
+        finally:
+            db.rollback()
+        cache.put((date, watermark), body)
+
+    return Response(body, mimetype="application/json", headers=kpi_headers(date, watermark))
+
+def kpi_etag(date, watermark):
+    return f"kpi-{date}-{watermark}"
+
+def kpi_headers(date, watermark):
+    return {"ETag": f'"{kpi_etag(date, watermark)}"', "Cache-Control": "no-cache"}
 
+def load_kpi_rows(db, date):
     rows = db.execute("""
         SELECT date, shift, line_id,
-               produced_count, defect_count, stop_minutes, avg_cycle_time,
+               produced_count, defect_count, stop_minutes,
+               ct_count, ct_sum, ct_sumsq, ct_min, ct_max,
                last_event_ts
         FROM summary_shift
         WHERE date = ?
         ORDER BY line_id ASC, shift ASC
     """, (date,)).fetchall()
+    return [with_cycle_stats(r) for r in rows]
+
+@bp.route("/kpi/archive", methods=["GET"])
+def kpi_archive():
+    # 월 단위 리포트: SQLite 대신 컬럼형 아카이브를 mmap 으로 집계
+    try:
+        start = date.fromisoformat(request.args["from"])
+        end = date.fromisoformat(request.args["to"])
+    except (KeyError, ValueError):
+        return jsonify({"ok": False, "error": "from and to (YYYY-MM-DD) are required"}), 400
+
+    calendar = from_spec(current_app.config["SHIFTS"], current_app.config["HOLIDAYS"])
+    rows = archive.scan_kpi(
+        current_app.config["ARCHIVE_DIR"], start, end, calendar, line_id=request.args.get("line")
+    )
+    return jsonify(rows)
+
+def parse_ts(value):
+    # epoch 초 또는 로컬 시각 ISO 문자열 (2026-02-03T08:00)
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp())
+
+@bp.route("/kpi/trend", methods=["GET"])
+def kpi_trend():
+    try:
+        line_id = request.args["line"]
+        start = parse_ts(request.args["from"])
+        end = parse_ts(request.args["to"])
+        step = int(request.args.get("step", 3600))
+    except (KeyError, ValueError):
+        return jsonify({"ok": False, "error": "line, from and to are required"}), 400
+    if step <= 0 or end <= start:
+        return jsonify({"ok": False, "error": "invalid range or step"}), 400
+
+    try:
+        resolution, rows = rollups.query_series(
+            get_db(), line_id, start, end, step, station_id=request.args.get("station")
+        )
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    points = []
+    for r in rows:
+        p = with_cycle_stats(r)
+        p.pop("grp")
+        points.append(p)
+    return jsonify({"line_id": line_id, "resolution": resolution, "step": step, "points": points})
+
+@bp.route("/kpi/downtime", methods=["GET"])
+def kpi_downtime():
+    # 워커가 미리 짝지은 stop_intervals 만 읽는다 (진행 중인 정지는 STOP_END 후 반영)
+    try:
+        line_id = request.args["line"]
+        start = parse_ts(request.args["from"])
+        end = parse_ts(request.args["to"])
+    except (KeyError, ValueError):
+        return jsonify({"ok": False, "error": "line, from and to are required"}), 400
+    if end <= start:
+        return jsonify({"ok": False, "error": "invalid range"}), 400
+
+    intervals = downtime.query_intervals(get_db(), line_id, start, end)
+    stopped = sum(i["end_ts"] - i["start_ts"] for i in intervals)
+    return jsonify({
+        "line_id": line_id,
+        "from": start,
+        "to": end,
+        "stop_minutes": downtime.minutes(stopped),
+        "availability": round(1 - stopped / (end - start), 4),
+        "intervals": intervals,
+    })
+
+@bp.route("/kpi/bottleneck", methods=["GET"])
+def kpi_bottleneck():
+    line_id = request.args.get("line")
+    shift = request.args.get("shift")
+    if not line_id or not shift:
+        return jsonify({"ok": False, "error": "line and shift are required"}), 400
+    # 야간 교대는 자정을 넘기므로 달력 날짜가 아니라 지금 시각이 속한 교대의 귀속 일자
+    d = request.args.get("date")
+    if not d:
+        calendar = from_spec(current_app.config["SHIFTS"], current_app.config["HOLIDAYS"])
+        d = calendar.bucket_one(int(datetime.now().timestamp()))[0]
+
+    ranked = stations.ranking(get_db(), line_id, d, shift)
+    return jsonify({
+        "line_id": line_id,
+        "date": d,
+        "shift": shift,
+        "bottleneck": ranked[0]["station_id"] if ranked else None,
+        "stations": ranked,
+    })
+
+@bp.route("/kpi/stream", methods=["GET"])
+def kpi_stream():
+    # 워커가 커밋한 교대 버킷 변경을 Server-Sent Events 로 푸시
+    hub = current_app.extensions["live_hub"]
+    date_filter = request.args.get("date")
+    q = hub.subscribe()
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    msg = q.get(timeout=15)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if date_filter and msg["event"] == "bucket" and msg["data"]["row"]["date"] != date_filter:
+                    continue
+                yield format_sse(msg)
+        finally:
+            hub.unsubscribe(q)
 
-    return jsonify([dict(r) for r in rows])
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
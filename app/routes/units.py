@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from app.db import get_db
+from app import units
+
+bp = Blueprint("units", __name__)
+
+MAX_BATCH_UNITS = 1000
+
+@bp.route("/units/<unit_id>/trace", methods=["GET"])
+def unit_trace(unit_id):
+    result = units.lookup(get_db(), [unit_id]).get(unit_id)
+    if result is None:
+        return jsonify({"ok": False, "error": "unknown unit_id"}), 404
+    return jsonify({"unit_id": unit_id, **result})
+
+@bp.route("/units/trace", methods=["POST"])
+def unit_trace_batch():
+    data = request.get_json(silent=True) or {}
+    unit_ids = data.get("unit_ids")
+    if not isinstance(unit_ids, list) or not all(isinstance(u, str) for u in unit_ids):
+        return jsonify({"ok": False, "error": "unit_ids must be a list of strings"}), 400
+    if len(unit_ids) > MAX_BATCH_UNITS:
+        return jsonify({"ok": False, "error": f"at most {MAX_BATCH_UNITS} unit_ids per request"}), 400
+
+    found = units.lookup(get_db(), unit_ids)
+    return jsonify({
+        "units": {u: found[u] for u in unit_ids if u in found},
+        "missing": [u for u in unit_ids if u not in found],
+    })
@@ -1,28 +1,17 @@
-CREATE TABLE IF NOT EXISTS raw_events (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  ts INTEGER NOT NULL,
-  device_id TEXT NOT NULL,
-  line_id TEXT NOT NULL,
-  station_id TEXT,
-  event_type TEXT NOT NULL,
-  unit_id TEXT,
-  cycle_time REAL,
-  defect_code TEXT,
-  stop_reason TEXT
-);
-
-CREATE INDEX IF NOT EXISTS idx_raw_ts ON raw_events(ts);
-CREATE INDEX IF NOT EXISTS idx_raw_line_ts ON raw_events(line_id, ts);
-CREATE INDEX IF NOT EXISTS idx_raw_unit ON raw_events(unit_id);
-
+-- stop_minutes: 정지 시간(분, 소수). STOP_START/END 구간 길이를 교대/버킷별로 나눈 값이며,
+-- 예전 STOP_MINUTE 이벤트는 1건 = 1분으로 같은 컬럼에 더해진다 (예전 DB 는 init_db 가 REAL 로 이관)
 CREATE TABLE IF NOT EXISTS summary_shift (
   date TEXT NOT NULL,
   shift TEXT NOT NULL,              
   line_id TEXT NOT NULL,
   produced_count INTEGER NOT NULL DEFAULT 0,
   defect_count INTEGER NOT NULL DEFAULT 0,
-  stop_minutes INTEGER NOT NULL DEFAULT 0,
-  avg_cycle_time REAL,
+  stop_minutes REAL NOT NULL DEFAULT 0,
+  ct_count INTEGER NOT NULL DEFAULT 0,
+  ct_sum REAL NOT NULL DEFAULT 0,
+  ct_sumsq REAL NOT NULL DEFAULT 0,
+  ct_min REAL,
+  ct_max REAL,
   last_event_ts INTEGER NOT NULL DEFAULT 0,
   PRIMARY KEY (date, shift, line_id)
 );
@@ -30,4 +19,176 @@ CREATE TABLE IF NOT EXISTS summary_shift (
 CREATE INDEX IF NOT EXISTS idx_summary_date_line
 ON summary_shift(date, line_id);
 
-ALTER TABLE summary_shift ADD COLUMN last_event_ts INTEGER NOT NULL DEFAULT 0;
+-- 분/시/일 단위 롤업 (station_id 가 없는 이벤트는 '')
+CREATE TABLE IF NOT EXISTS rollup_minute (
+  bucket_ts INTEGER NOT NULL,
+  line_id TEXT NOT NULL,
+  station_id TEXT NOT NULL DEFAULT '',
+  produced_count INTEGER NOT NULL DEFAULT 0,
+  defect_count INTEGER NOT NULL DEFAULT 0,
+  stop_minutes REAL NOT NULL DEFAULT 0,
+  ct_count INTEGER NOT NULL DEFAULT 0,
+  ct_sum REAL NOT NULL DEFAULT 0,
+  ct_sumsq REAL NOT NULL DEFAULT 0,
+  ct_min REAL,
+  ct_max REAL,
+  PRIMARY KEY (line_id, station_id, bucket_ts)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_hour (
+  bucket_ts INTEGER NOT NULL,
+  line_id TEXT NOT NULL,
+  station_id TEXT NOT NULL DEFAULT '',
+  produced_count INTEGER NOT NULL DEFAULT 0,
+  defect_count INTEGER NOT NULL DEFAULT 0,
+  stop_minutes REAL NOT NULL DEFAULT 0,
+  ct_count INTEGER NOT NULL DEFAULT 0,
+  ct_sum REAL NOT NULL DEFAULT 0,
+  ct_sumsq REAL NOT NULL DEFAULT 0,
+  ct_min REAL,
+  ct_max REAL,
+  PRIMARY KEY (line_id, station_id, bucket_ts)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_day (
+  bucket_ts INTEGER NOT NULL,
+  line_id TEXT NOT NULL,
+  station_id TEXT NOT NULL DEFAULT '',
+  produced_count INTEGER NOT NULL DEFAULT 0,
+  defect_count INTEGER NOT NULL DEFAULT 0,
+  stop_minutes REAL NOT NULL DEFAULT 0,
+  ct_count INTEGER NOT NULL DEFAULT 0,
+  ct_sum REAL NOT NULL DEFAULT 0,
+  ct_sumsq REAL NOT NULL DEFAULT 0,
+  ct_min REAL,
+  ct_max REAL,
+  PRIMARY KEY (line_id, station_id, bucket_ts)
+);
+
+-- 워커가 커밋할 때마다 바뀐 교대 버킷의 증분을 남기고, API 가 이를 SSE 로 중계
+CREATE TABLE IF NOT EXISTS summary_changes (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  date TEXT NOT NULL,
+  shift TEXT NOT NULL,
+  line_id TEXT NOT NULL,
+  produced_delta INTEGER NOT NULL DEFAULT 0,
+  defect_delta INTEGER NOT NULL DEFAULT 0,
+  stop_delta REAL NOT NULL DEFAULT 0,
+  created_ts INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS worker_checkpoint (
+  name TEXT PRIMARY KEY,
+  last_event_id INTEGER NOT NULL DEFAULT 0,
+  updated_ts INTEGER NOT NULL DEFAULT 0
+);
+
+
+-- STOP_START/STOP_END 를 짝지은 정지 구간. 교대 경계에서 잘라 조각마다 한 행
+CREATE TABLE IF NOT EXISTS stop_intervals (
+  id INTEGER PRIMARY KEY,
+  line_id TEXT NOT NULL,
+  start_ts INTEGER NOT NULL,
+  end_ts INTEGER NOT NULL,
+  date TEXT NOT NULL,
+  shift TEXT NOT NULL,
+  stop_reason TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_stop_line_ts ON stop_intervals(line_id, start_ts);
+
+-- 워커 tick 사이에 아직 STOP_END 가 오지 않은 라인별 정지
+CREATE TABLE IF NOT EXISTS stop_open (
+  line_id TEXT PRIMARY KEY,
+  start_ts INTEGER NOT NULL,
+  stop_reason TEXT
+);
+
+-- 유닛별 공정 이력: (unit, station) 마다 최초/최종 시각, 이벤트 수, 불량 여부
+CREATE TABLE IF NOT EXISTS unit_journey (
+  unit_id TEXT NOT NULL,
+  station_id TEXT NOT NULL DEFAULT '',
+  line_id TEXT NOT NULL,
+  first_ts INTEGER NOT NULL,
+  last_ts INTEGER NOT NULL,
+  event_count INTEGER NOT NULL DEFAULT 0,
+  defect_count INTEGER NOT NULL DEFAULT 0,
+  defect_code TEXT,
+  PRIMARY KEY (unit_id, station_id)
+) WITHOUT ROWID;
+
+-- 스테이션 x 교대 집계 (병목/가동률 분석). busy = 사이클타임 합, idle = 완료~다음 시작 공백
+-- blocked = 완료한 유닛을 다음 공정이 바빠 못 넘긴 시간, starved = idle - blocked
+CREATE TABLE IF NOT EXISTS station_shift (
+  date TEXT NOT NULL,
+  shift TEXT NOT NULL,
+  line_id TEXT NOT NULL,
+  station_id TEXT NOT NULL,
+  produced_count INTEGER NOT NULL DEFAULT 0,
+  defect_count INTEGER NOT NULL DEFAULT 0,
+  ct_count INTEGER NOT NULL DEFAULT 0,
+  ct_sum REAL NOT NULL DEFAULT 0,
+  busy_sec REAL NOT NULL DEFAULT 0,
+  idle_sec REAL NOT NULL DEFAULT 0,
+  blocked_sec REAL NOT NULL DEFAULT 0,
+  last_event_ts INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (date, shift, line_id, station_id)
+);
+
+-- 사이클타임 고정 버킷 히스토그램 (bucket = app/stations.py CT_BUCKETS 인덱스)
+CREATE TABLE IF NOT EXISTS station_ct_hist (
+  date TEXT NOT NULL,
+  shift TEXT NOT NULL,
+  line_id TEXT NOT NULL,
+  station_id TEXT NOT NULL,
+  bucket INTEGER NOT NULL,
+  count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (date, shift, line_id, station_id, bucket)
+) WITHOUT ROWID;
+
+-- 스테이션별 마지막 완료 시각 (tick 사이 공백 계산용)
+CREATE TABLE IF NOT EXISTS station_state (
+  line_id TEXT NOT NULL,
+  station_id TEXT NOT NULL,
+  last_end_ts REAL NOT NULL,
+  PRIMARY KEY (line_id, station_id)
+);
+
+-- CSV 적재 진행 위치. 이벤트와 같은 트랜잭션으로 커밋되므로 중단 후 그 바이트부터 재개
+CREATE TABLE IF NOT EXISTS import_checkpoint (
+  path TEXT PRIMARY KEY,
+  byte_offset INTEGER NOT NULL DEFAULT 0,
+  rows_loaded INTEGER NOT NULL DEFAULT 0,
+  rows_rejected INTEGER NOT NULL DEFAULT 0,
+  updated_ts INTEGER NOT NULL DEFAULT 0
+);
+
+-- 클라이언트 event_id 중복 제거 (raw_events 가 파티션 뷰여도 쓸 수 있게 별도 테이블)
+-- event_id 는 장비 안에서만 유일하다고 보고 device_id 와 묶어 키로 쓴다
+CREATE TABLE IF NOT EXISTS ingest_dedupe (
+  device_id TEXT NOT NULL,
+  event_id TEXT NOT NULL,
+  created_ts INTEGER NOT NULL,
+  PRIMARY KEY (device_id, event_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_dedupe_created ON ingest_dedupe(created_ts);
+
+-- 워커 샤딩: 라인마다 소유 워커와 만료 시각. 만료된 라인은 다른 워커가 가져간다
+CREATE TABLE IF NOT EXISTS worker_lease (
+  line_id TEXT PRIMARY KEY,
+  owner TEXT,
+  expires_ts REAL NOT NULL DEFAULT 0
+);
+
+-- 살아 있는 워커 목록 (라인을 아직 못 가진 워커도 몫 계산에 들어가도록)
+CREATE TABLE IF NOT EXISTS worker_node (
+  owner TEXT PRIMARY KEY,
+  expires_ts REAL NOT NULL
+);
+
+-- 재계산(recompute)처럼 체크포인트와 무관하게 summary_shift 를 바꾸는 작업이 올리는 세대 번호
+CREATE TABLE IF NOT EXISTS summary_generation (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  generation INTEGER NOT NULL
+);
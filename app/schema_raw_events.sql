@@ -0,0 +1,16 @@
+CREATE TABLE IF NOT EXISTS raw_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  ts INTEGER NOT NULL,
+  device_id TEXT NOT NULL,
+  line_id TEXT NOT NULL,
+  station_id TEXT,
+  event_type TEXT NOT NULL,
+  unit_id TEXT,
+  cycle_time REAL,
+  defect_code TEXT,
+  stop_reason TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_raw_ts ON raw_events(ts);
+CREATE INDEX IF NOT EXISTS idx_raw_line_ts ON raw_events(line_id, ts);
+CREATE INDEX IF NOT EXISTS idx_raw_unit ON raw_events(unit_id);
@@ -0,0 +1,103 @@
+import time
+from datetime import date, timedelta
+import numpy as np
+
+EPOCH = date(1970, 1, 1)
+HOLIDAY = "HOLIDAY"
+
+def parse_shifts(spec):
+    # "DAY@08:00,NIGHT@20:00" → [("DAY", 8, 0), ("NIGHT", 20, 0)]
+    shifts = []
+    for part in spec.split(","):
+        name, start = part.strip().split("@")
+        hh, mm = start.split(":")
+        shifts.append((name, int(hh), int(mm)))
+    return shifts
+
+def parse_holidays(spec):
+    return {date.fromisoformat(d.strip()) for d in spec.split(",") if d.strip()}
+
+# 교대 시작 시각 목록으로 정의되는 교대 달력
+# 각 교대는 다음 교대 시작 전까지이며, 시작한 날짜로 귀속된다 (NIGHT 20~08 → 시작일)
+# 휴일은 그날 첫 교대 시작부터 다음 날 첫 교대 시작까지 HOLIDAY 하나로 묶는다
+class ShiftCalendar:
+    def __init__(self, shifts, holidays=()):
+        starts = [(h, m) for _, h, m in shifts]
+        if starts != sorted(starts):
+            raise ValueError("shift start times must be ascending within a day")
+        self.shifts = list(shifts)
+        self.holidays = set(holidays)
+        self.shift_names = [name for name, _, _ in shifts] + [HOLIDAY]
+        self._built = set()
+        self._bounds = self._days = self._codes = None
+
+    def _build(self, day_codes):
+        # 경계표는 정렬된 일자 목록에 대해서만 만든다 (사이에 빠진 날이 있어도 됨)
+        bounds, days, codes = [], [], []
+        holiday_code = len(self.shifts)
+        for day in day_codes:
+            d = EPOCH + timedelta(days=day)
+            entries = self.shifts[:1] if d in self.holidays else self.shifts
+            for i, (_, h, m) in enumerate(entries):
+                bounds.append(int(time.mktime((d.year, d.month, d.day, h, m, 0, 0, 0, -1))))
+                days.append(day)
+                codes.append(holiday_code if d in self.holidays else i)
+        self._bounds = np.array(bounds, dtype=np.int64)
+        self._days = np.array(days, dtype=np.int32)
+        self._codes = np.array(codes, dtype=np.int8)
+
+    def boundary_table(self, start: date, end: date):
+        # (교대 시작 epoch, 귀속 일자 코드, 교대 코드) 배열
+        self._ensure((start - EPOCH).days, (end - EPOCH).days)
+        return self._bounds, self._days, self._codes
+
+    def _ensure(self, lo_day, hi_day):
+        self._ensure_days(range(lo_day, hi_day + 1))
+
+    def _ensure_days(self, day_codes):
+        # 실제로 본 일자만 추가한다. 잘못된 ts 하나가 섞여도 그 사이 수십 년치 표를 만들지 않는다
+        missing = set(day_codes) - self._built
+        if missing:
+            self._built |= missing
+            self._build(sorted(self._built))
+
+    def bucket(self, ts):
+        # epoch 배열 → (일자 코드 = 1970-01-01 기준 일수, 교대 코드) 를 한 번에 계산
+        ts = np.asarray(ts, dtype=np.int64)
+        if len(ts) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8)
+        # 행이 있는 일자마다 로컬 자정 기준 ±1일 여유를 두고 경계표를 준비
+        self._ensure_days({d + k for d in np.unique(ts // 86400).tolist() for k in range(-2, 3)})
+        idx = np.searchsorted(self._bounds, ts, side="right") - 1
+        return self._days[idx], self._codes[idx]
+
+    def day_window(self, d: date):
+        # d 에 귀속되는 교대 전체 구간 [그날 첫 교대 시작, 다음 날 첫 교대 시작)
+        _, h, m = self.shifts[0]
+        nxt = d + timedelta(days=1)
+        return (
+            int(time.mktime((d.year, d.month, d.day, h, m, 0, 0, 0, -1))),
+            int(time.mktime((nxt.year, nxt.month, nxt.day, h, m, 0, 0, 0, -1))),
+        )
+
+    def split(self, start, end):
+        # [start, end) 구간을 교대 경계에서 잘라 [(조각 시작, 조각 끝, 일자, 교대), ...]
+        self._ensure(start // 86400 - 2, end // 86400 + 2)
+        i = int(np.searchsorted(self._bounds, start, side="right")) - 1
+        pieces = []
+        while start < end:
+            stop = min(end, int(self._bounds[i + 1]))
+            pieces.append((start, stop, self.date_label(self._days[i]), self.shift_names[self._codes[i]]))
+            start = stop
+            i += 1
+        return pieces
+
+    def date_label(self, day_code):
+        return (EPOCH + timedelta(days=int(day_code))).isoformat()
+
+    def bucket_one(self, ts):
+        days, codes = self.bucket([ts])
+        return self.date_label(days[0]), self.shift_names[codes[0]]
+
+def from_spec(shifts, holidays=""):
+    return ShiftCalendar(parse_shifts(shifts), parse_holidays(holidays))
@@ -0,0 +1,167 @@
+from bisect import bisect_left
+
+# 사이클타임 히스토그램 버킷 상한(초). 마지막 인덱스(len(CT_BUCKETS))는 그 이상 전부
+CT_BUCKETS = [2, 4, 6, 8, 10, 12, 14, 16, 20, 30, 60]
+# 이보다 긴 공백은 비가동(교대 사이, 라인 정지)으로 보고 idle/blocked 에 넣지 않는다
+MAX_IDLE_SEC = 900
+LOOKUP_CHUNK = 500
+
+def ct_bucket(ct):
+    return bisect_left(CT_BUCKETS, ct)
+
+def prefetch_state(cur, rows, state):
+    # 이번 배치에 처음 보이는 (라인, 스테이션) 의 마지막 완료 시각만 station_state PK 로 가져온다
+    # 기록이 없는 스테이션은 None 으로 두어 다음 배치에서 다시 찾지 않는다
+    wanted = {}
+    for r in rows:
+        key = (r["line_id"], r["station_id"])
+        if r["station_id"] is not None and key not in state:
+            state[key] = None
+            wanted.setdefault(r["line_id"], []).append(r["station_id"])
+    for line_id, ids in wanted.items():
+        for i in range(0, len(ids), LOOKUP_CHUNK):
+            chunk = ids[i:i + LOOKUP_CHUNK]
+            for r in cur.execute(f"""
+                SELECT station_id, last_end_ts FROM station_state
+                WHERE line_id=? AND station_id IN ({",".join("?" * len(chunk))})
+            """, (line_id, *chunk)):
+                state[(line_id, r["station_id"])] = r["last_end_ts"]
+
+def prefetch_units(cur, rows, unit_done):
+    # 이번 배치에 처음 보이는 유닛의 앞 공정 완료 시각을 unit_journey 에서 가져온다
+    ids = list({r["unit_id"] for r in rows if r["unit_id"] is not None and r["unit_id"] not in unit_done})
+    for i in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[i:i + LOOKUP_CHUNK]
+        for u in chunk:
+            unit_done[u] = {}
+        for r in cur.execute(f"""
+            SELECT unit_id, station_id, last_ts FROM unit_journey
+            WHERE unit_id IN ({",".join("?" * len(chunk))})
+        """, chunk):
+            unit_done[r["unit_id"]][r["station_id"]] = r["last_ts"]
+
+def new_stat():
+    # produced, defect, ct_count, ct_sum, busy_sec, idle_sec, blocked_sec, last_event_ts
+    return [0, 0, 0, 0.0, 0.0, 0.0, 0.0, 0]
+
+def stat_for(stats, key):
+    s = stats.get(key)
+    if s is None:
+        s = stats[key] = new_stat()
+    return s
+
+def fold_event(stats, hist, state, unit_done, key, ev):
+    # key: 워커의 교대 버킷 (date, shift, line_id)
+    station = ev["station_id"]
+    if station is None:
+        return
+    skey = (*key, station)
+    s = stat_for(stats, skey)
+
+    ts = ev["ts"]
+    et = ev["event_type"]
+    if et == "DEFECT":
+        s[1] += 1
+    elif et == "PRODUCED":
+        s[0] += 1
+        if ev["cycle_time"] is not None:
+            ct = float(ev["cycle_time"])
+            s[2] += 1
+            s[3] += ct
+            s[4] += ct
+            h = (*skey, ct_bucket(ct))
+            hist[h] = hist.get(h, 0) + 1
+
+            start = ts - ct
+            prev = state.get((key[2], station))
+            if prev is not None and 0 < start - prev <= MAX_IDLE_SEC:
+                s[5] += start - prev
+
+            # 앞 공정이 이 유닛을 끝낸 뒤 이 스테이션이 아직 바빴던 만큼은 앞 공정의 blocked
+            done = unit_done.get(ev["unit_id"], {})
+            upstream = max(((t, st) for st, t in done.items() if st != station), default=None)
+            if upstream is not None and prev is not None:
+                waited = min(start, prev) - upstream[0]
+                if 0 < waited <= MAX_IDLE_SEC:
+                    stat_for(stats, (*key, upstream[1]))[6] += waited
+            state[(key[2], station)] = ts if prev is None else max(prev, ts)
+        if ev["unit_id"] is not None:
+            unit_done.setdefault(ev["unit_id"], {})[station] = ts
+
+    s[7] = max(s[7], ts)
+
+def apply_deltas(cur, stats, hist, state):
+    cur.executemany("""
+        INSERT INTO station_shift
+        (date, shift, line_id, station_id, produced_count, defect_count, ct_count, ct_sum,
+         busy_sec, idle_sec, blocked_sec, last_event_ts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(date, shift, line_id, station_id) DO UPDATE SET
+            produced_count=produced_count + excluded.produced_count,
+            defect_count=defect_count + excluded.defect_count,
+            ct_count=ct_count + excluded.ct_count,
+            ct_sum=ct_sum + excluded.ct_sum,
+            busy_sec=busy_sec + excluded.busy_sec,
+            idle_sec=idle_sec + excluded.idle_sec,
+            blocked_sec=blocked_sec + excluded.blocked_sec,
+            last_event_ts=MAX(last_event_ts, excluded.last_event_ts)
+    """, [(*k, *s) for k, s in stats.items()])
+    cur.executemany("""
+        INSERT INTO station_ct_hist (date, shift, line_id, station_id, bucket, count)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(date, shift, line_id, station_id, bucket) DO UPDATE SET
+            count=count + excluded.count
+    """, [(*k, n) for k, n in hist.items()])
+    cur.executemany("""
+        INSERT INTO station_state (line_id, station_id, last_end_ts) VALUES (?, ?, ?)
+        ON CONFLICT(line_id, station_id) DO UPDATE SET
+            last_end_ts=MAX(last_end_ts, excluded.last_end_ts)
+    """, [(*k, ts) for k, ts in state.items() if ts is not None])
+
+def histogram_quantile(counts, q):
+    # 고정 버킷에서 q 분위가 들어 있는 버킷 상한 (마지막 버킷이면 None)
+    total = sum(counts)
+    if not total:
+        return None
+    acc = 0
+    for i, n in enumerate(counts):
+        acc += n
+        if acc >= q * total:
+            return CT_BUCKETS[i] if i < len(CT_BUCKETS) else None
+    return None
+
+def ranking(db, line_id, date, shift):
+    # PK 앞부분 (date, shift, line_id) 로 스테이션 수만큼만 읽는다
+    rows = db.execute("""
+        SELECT * FROM station_shift WHERE date=? AND shift=? AND line_id=?
+    """, (date, shift, line_id)).fetchall()
+    hist = {}
+    for r in db.execute("""
+        SELECT station_id, bucket, count FROM station_ct_hist WHERE date=? AND shift=? AND line_id=?
+    """, (date, shift, line_id)):
+        hist.setdefault(r["station_id"], [0] * (len(CT_BUCKETS) + 1))[r["bucket"]] = r["count"]
+
+    out = []
+    for r in rows:
+        counts = hist.get(r["station_id"], [0] * (len(CT_BUCKETS) + 1))
+        active = r["busy_sec"] + r["idle_sec"]
+        blocked = min(r["blocked_sec"], r["idle_sec"])
+        out.append({
+            "station_id": r["station_id"],
+            "produced_count": r["produced_count"],
+            "defect_rate": round(r["defect_count"] / r["produced_count"], 4) if r["produced_count"] else None,
+            "avg_cycle_time": round(r["ct_sum"] / r["ct_count"], 3) if r["ct_count"] else None,
+            "p50_cycle_le": histogram_quantile(counts, 0.5),
+            "p90_cycle_le": histogram_quantile(counts, 0.9),
+            "busy_sec": round(r["busy_sec"], 1),
+            "starved_sec": round(r["idle_sec"] - blocked, 1),
+            "blocked_sec": round(blocked, 1),
+            # 병목은 쉬는 시간(starved/blocked) 비율이 가장 낮은 스테이션
+            "utilization": round(r["busy_sec"] / active, 4) if active else None,
+            "ct_histogram": [
+                {"le": CT_BUCKETS[i] if i < len(CT_BUCKETS) else None, "count": n}
+                for i, n in enumerate(counts)
+            ],
+        })
+    out.sort(key=lambda s: (s["utilization"] is None, -(s["utilization"] or 0), -(s["avg_cycle_time"] or 0)))
+    return out
@@ -0,0 +1,35 @@
+import sqlite3
+
+# 연결 생성 시 적용할 PRAGMA 묶음 (app/config.py 의 STORAGE_PROFILE 로 선택)
+PROFILES = {
+    # SQLite 기본값에 가까운 설정: 롤백 저널 + 매 커밋 fsync
+    "safe": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+    },
+    # WAL 로 API 읽기와 워커 쓰기가 서로 막지 않게 하고, 체크포인트 시에만 fsync
+    "default": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+    # 대량 적재용: 전원 장애 시 마지막 트랜잭션 유실 가능
+    "bulk": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+    },
+}
+
+def connect(db_path, pragmas=None, **kwargs):
+    conn = sqlite3.connect(db_path, **kwargs)
+    for name, value in (pragmas or {}).items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
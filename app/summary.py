@@ -0,0 +1,74 @@
+import time
+import numpy as np
+
+# summary_shift (일자, 교대, 라인) 집계: 워커 증분과 recompute 재계산이 같은 함수로 접는다
+CHANGES_RETENTION_SEC = 3600
+
+def bucket_keys(calendar, rows):
+    # 행마다 datetime 을 만들지 않고 교대 경계표로 한 번에 (date, shift) 를 구한다
+    ts = np.fromiter((r["ts"] for r in rows), dtype=np.int64, count=len(rows))
+    days, codes = calendar.bucket(ts)
+    labels = {}
+    keys = []
+    for r, day, code in zip(rows, days.tolist(), codes.tolist()):
+        date = labels.get(day)
+        if date is None:
+            date = labels[day] = calendar.date_label(day)
+        keys.append((date, calendar.shift_names[code], r["line_id"]))
+    return keys
+
+def new_delta():
+    # produced, defect, stop_minutes, ct_count, ct_sum, ct_sumsq, ct_min, ct_max, last_event_ts
+    return [0, 0, 0, 0, 0.0, 0.0, None, None, 0]
+
+def delta_for(deltas, key):
+    d = deltas.get(key)
+    if d is None:
+        d = deltas[key] = new_delta()
+    return d
+
+def fold_event(d, ev):
+    et = ev["event_type"]
+    if et == "PRODUCED":
+        d[0] += 1
+    elif et == "DEFECT":
+        d[1] += 1
+    elif et == "STOP_MINUTE":
+        d[2] += 1
+
+    if ev["cycle_time"] is not None:
+        ct = float(ev["cycle_time"])
+        d[3] += 1
+        d[4] += ct
+        d[5] += ct * ct
+        d[6] = ct if d[6] is None else min(d[6], ct)
+        d[7] = ct if d[7] is None else max(d[7], ct)
+
+    d[8] = max(d[8], ev["ts"])
+
+def apply_deltas(cur, deltas):
+    cur.executemany("""
+        INSERT INTO summary_shift
+        (date, shift, line_id, produced_count, defect_count, stop_minutes,
+         ct_count, ct_sum, ct_sumsq, ct_min, ct_max, last_event_ts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(date, shift, line_id) DO UPDATE SET
+            produced_count=produced_count + excluded.produced_count,
+            defect_count=defect_count + excluded.defect_count,
+            stop_minutes=stop_minutes + excluded.stop_minutes,
+            ct_count=ct_count + excluded.ct_count,
+            ct_sum=ct_sum + excluded.ct_sum,
+            ct_sumsq=ct_sumsq + excluded.ct_sumsq,
+            ct_min=MIN(COALESCE(ct_min, excluded.ct_min), COALESCE(excluded.ct_min, ct_min)),
+            ct_max=MAX(COALESCE(ct_max, excluded.ct_max), COALESCE(excluded.ct_max, ct_max)),
+            last_event_ts=MAX(last_event_ts, excluded.last_event_ts)
+    """, [(*key, *d) for key, d in deltas.items()])
+
+def publish_changes(cur, deltas):
+    now = int(time.time())
+    cur.executemany("""
+        INSERT INTO summary_changes
+        (date, shift, line_id, produced_delta, defect_delta, stop_delta, created_ts)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(*key, d[0], d[1], d[2], now) for key, d in deltas.items()])
+    cur.execute("DELETE FROM summary_changes WHERE created_ts < ?", (now - CHANGES_RETENTION_SEC,))
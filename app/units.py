@@ -0,0 +1,71 @@
+# 워커가 유닛별 공정 이력을 증분 유지하고, 조회는 unit_journey PK 로 station 수만큼만 읽는다
+LOOKUP_CHUNK = 500
+
+def fold_event(journeys, ev):
+    unit_id = ev["unit_id"]
+    if unit_id is None:
+        return
+    key = (unit_id, ev["station_id"] or "")
+    j = journeys.get(key)
+    ts = ev["ts"]
+    if j is None:
+        # line_id, first_ts, last_ts, event_count, defect_count, defect_code
+        j = journeys[key] = [ev["line_id"], ts, ts, 0, 0, None]
+    j[1] = min(j[1], ts)
+    j[2] = max(j[2], ts)
+    j[3] += 1
+    if ev["event_type"] == "DEFECT":
+        j[4] += 1
+        j[5] = ev["defect_code"] or j[5]
+
+def apply_deltas(cur, journeys):
+    cur.executemany("""
+        INSERT INTO unit_journey
+        (unit_id, station_id, line_id, first_ts, last_ts, event_count, defect_count, defect_code)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(unit_id, station_id) DO UPDATE SET
+            first_ts=MIN(first_ts, excluded.first_ts),
+            last_ts=MAX(last_ts, excluded.last_ts),
+            event_count=event_count + excluded.event_count,
+            defect_count=defect_count + excluded.defect_count,
+            defect_code=COALESCE(excluded.defect_code, defect_code)
+    """, [(*key, *j) for key, j in journeys.items()])
+
+def lookup(db, unit_ids):
+    # {unit_id: [station 단계, ...]} (first_ts 순). 없는 유닛은 결과에 없음
+    traces = {}
+    unit_ids = list(dict.fromkeys(unit_ids))
+    for i in range(0, len(unit_ids), LOOKUP_CHUNK):
+        chunk = unit_ids[i:i + LOOKUP_CHUNK]
+        rows = db.execute(f"""
+            SELECT unit_id, station_id, line_id, first_ts, last_ts, event_count, defect_count, defect_code
+            FROM unit_journey
+            WHERE unit_id IN ({",".join("?" * len(chunk))})
+            ORDER BY unit_id, first_ts
+        """, chunk).fetchall()
+        for r in rows:
+            traces.setdefault(r["unit_id"], []).append(r)
+    return {unit_id: trace(steps) for unit_id, steps in traces.items()}
+
+def trace(steps):
+    out = []
+    for i, r in enumerate(steps):
+        nxt = steps[i + 1]["first_ts"] if i + 1 < len(steps) else None
+        out.append({
+            "station_id": r["station_id"] or None,
+            "line_id": r["line_id"],
+            "first_ts": r["first_ts"],
+            "last_ts": r["last_ts"],
+            "dwell_sec": r["last_ts"] - r["first_ts"],
+            # 다음 공정에 들어가기까지의 대기 시간
+            "transfer_sec": None if nxt is None else nxt - r["last_ts"],
+            "event_count": r["event_count"],
+            "defect": r["defect_count"] > 0,
+            "defect_code": r["defect_code"],
+        })
+    return {
+        "stations": out,
+        "defect": any(s["defect"] for s in out),
+        "first_ts": min(s["first_ts"] for s in out),
+        "last_ts": max(s["last_ts"] for s in out),
+    }
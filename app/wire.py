@@ -0,0 +1,207 @@
+import struct
+from itertools import repeat
+
+from app.events import dedupe_key, valid_cycle_time, valid_ts
+
+# 이벤트 수집용 고정 바이너리 형식 (Content-Type: application/x-sf-events), 정수는 little endian
+# 프레임 = 헤더 + 공통 차원 + 컬럼들. 본문에는 프레임을 여러 개 이어 붙일 수 있다
+#   헤더       magic "SFEV"(4) | version u8 | count u16 | columns u8 (아래 컬럼 비트 마스크)
+#   공통 차원  device_id str | line_id str | station_id str  (프레임 안 모든 이벤트가 공유)
+#   event_type 이름표 개수 u8 + str 들 | 이벤트별 이름표 번호 u8 × count
+#   컬럼       unit_id | cycle_time | defect_code | stop_reason | event_id | ts (마스크에 있는 것만, 이 순서)
+#              문자열 컬럼 = 바이트 길이 u32 + 값들을 0x1F 로 이은 UTF-8 (빈 문자열 = null)
+#              cycle_time = f64 × count (NaN = null)
+#              ts = 장비가 기록한 발생 시각 epoch 초 f64 × count (NaN = null → 서버 수신 시각)
+#   str        길이 u16 + UTF-8 (0xFFFF = null)
+# 이벤트를 하나씩 풀지 않고 컬럼 단위로 split/unpack 한 뒤 zip 으로 insert 튜플을 만든다
+# cycle_time/ts 는 JSON 경로와 같은 규칙으로 검증해 어긋난 이벤트만 거부 결과 dict 로 바꾼다
+CONTENT_TYPE = "application/x-sf-events"
+MAGIC = b"SFEV"
+VERSION = 1
+
+COL_UNIT = 1
+COL_CT = 2
+COL_DEFECT = 4
+COL_STOP = 8
+COL_EVENT_ID = 16
+COL_TS = 32
+COLUMNS = [
+    (COL_UNIT, "unit_id"),
+    (COL_CT, "cycle_time"),
+    (COL_DEFECT, "defect_code"),
+    (COL_STOP, "stop_reason"),
+    (COL_EVENT_ID, "event_id"),
+    (COL_TS, "ts"),
+]
+FLOAT_COLUMNS = COL_CT | COL_TS
+
+SEP = "\x1f"
+NULL_LEN = 0xFFFF
+MAX_COUNT = 0xFFFF
+
+_HEAD = struct.Struct("<4sBHB")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+def is_binary(content_type):
+    return (content_type or "").split(";")[0].strip().lower() == CONTENT_TYPE
+
+# --- 서버: 본문 → [(insert 튜플, event_id), ...] ---
+
+def _str(buf, pos):
+    (n,) = _U16.unpack_from(buf, pos)
+    pos += 2
+    if n == NULL_LEN:
+        return None, pos
+    if pos + n > len(buf):
+        raise ValueError("truncated string")
+    return buf[pos:pos + n].decode("utf-8"), pos + n
+
+def _str_column(buf, pos, count):
+    (size,) = _U32.unpack_from(buf, pos)
+    pos += 4
+    if pos + size > len(buf):
+        raise ValueError("truncated column")
+    values = buf[pos:pos + size].decode("utf-8").split(SEP)
+    if len(values) != count:
+        raise ValueError("column length does not match count")
+    return [v or None for v in values], pos + size
+
+def _invalid(cols, count, now):
+    # 이벤트 번호 → 어긋난 필드 목록 (events.invalid_fields 와 같은 기준)
+    bad = {}
+    for i, x in enumerate(cols.get("cycle_time") or ()):
+        if x is not None and not valid_cycle_time(x):
+            bad.setdefault(i, []).append("cycle_time")
+    for i, x in enumerate(cols.get("ts") or ()):
+        if x is not None and not valid_ts(x, now):
+            bad.setdefault(i, []).append("ts")
+    return bad
+
+def decode(body, ts):
+    # [(insert 튜플, 중복 판정 키) 또는 거부 결과 dict, ...] — routes.ingest.json_items 와 같은 모양
+    # 컬럼 순서는 events.to_row 와 같다 (ts 컬럼이 없거나 null 이면 JSON 경로처럼 서버 수신 시각)
+    # 중복 판정 키는 events.dedupe_key 와 같은 (device_id, event_id)
+    buf = bytes(body)
+    items = []
+    pos = 0
+    try:
+        while pos < len(buf):
+            magic, version, count, columns = _HEAD.unpack_from(buf, pos)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"bad frame header at byte {pos}")
+            pos += _HEAD.size
+            device_id, pos = _str(buf, pos)
+            line_id, pos = _str(buf, pos)
+            station_id, pos = _str(buf, pos)
+            if device_id is None or line_id is None:
+                raise ValueError("device_id and line_id are required")
+
+            (n_types,) = _U8.unpack_from(buf, pos)
+            pos += 1
+            names = []
+            for _ in range(n_types):
+                name, pos = _str(buf, pos)
+                if name is None:
+                    raise ValueError("event_type is required")
+                names.append(name)
+            if pos + count > len(buf):
+                raise ValueError("truncated event_type column")
+            event_types = [names[c] for c in buf[pos:pos + count]]
+            pos += count
+
+            cols = {}
+            for bit, name in COLUMNS:
+                if not columns & bit:
+                    continue
+                if bit & FLOAT_COLUMNS:
+                    cols[name] = [None if x != x else x for x in struct.unpack_from(f"<{count}d", buf, pos)]
+                    pos += 8 * count
+                else:
+                    cols[name], pos = _str_column(buf, pos, count)
+
+            bad = _invalid(cols, count, ts)
+            if "ts" in cols:
+                times = [ts if x is None or i in bad else int(x) for i, x in enumerate(cols["ts"])]
+            else:
+                times = repeat(ts)
+
+            # event_types 길이가 count 라 나머지는 끝없는 repeat 로 채워도 된다
+            none = repeat(None)
+            rows = zip(
+                times, repeat(device_id), repeat(line_id), repeat(station_id), event_types,
+                cols.get("unit_id", none), cols.get("cycle_time", none),
+                cols.get("defect_code", none), cols.get("stop_reason", none),
+            )
+            frame = list(zip(rows, (dedupe_key(device_id, eid) for eid in cols.get("event_id", [None] * count))))
+            for i, fields in bad.items():
+                frame[i] = {"index": len(items) + i, "ok": False, "error": "invalid_record", "invalid": fields}
+            items.extend(frame)
+    except struct.error:
+        raise ValueError(f"truncated frame at byte {pos}")
+    except IndexError:
+        raise ValueError("event_type index out of range")
+    return items
+
+# --- 장비/부하 발생기: 이벤트 dict 목록 → 본문 ---
+
+def _put_str(out, s):
+    if s is None:
+        out += _U16.pack(NULL_LEN)
+        return
+    b = str(s).encode("utf-8")
+    if len(b) >= NULL_LEN:
+        raise ValueError("string too long")
+    out += _U16.pack(len(b))
+    out += b
+
+def _put_str_column(out, values):
+    values = ["" if v is None else str(v) for v in values]
+    if any(SEP in v for v in values):
+        raise ValueError("string value contains the 0x1F separator")
+    b = SEP.join(values).encode("utf-8")
+    out += _U32.pack(len(b))
+    out += b
+
+def _put_frame(out, dims, events):
+    columns = 0
+    for bit, name in COLUMNS:
+        if any(ev.get(name) is not None for ev in events):
+            columns |= bit
+
+    out += _HEAD.pack(MAGIC, VERSION, len(events), columns)
+    for s in dims:
+        _put_str(out, s)
+
+    names = list(dict.fromkeys(ev["event_type"] for ev in events))
+    if len(names) > 255:
+        raise ValueError("too many distinct event types in one frame")
+    out += _U8.pack(len(names))
+    for name in names:
+        _put_str(out, name)
+    index = {name: i for i, name in enumerate(names)}
+    out += bytes(index[ev["event_type"]] for ev in events)
+
+    for bit, name in COLUMNS:
+        if not columns & bit:
+            continue
+        values = [ev.get(name) for ev in events]
+        if bit & FLOAT_COLUMNS:
+            out += struct.pack(f"<{len(values)}d", *(float("nan") if x is None else float(x) for x in values))
+        else:
+            _put_str_column(out, values)
+
+def encode(events):
+    # 연속해서 같은 (device, line, station) 인 이벤트를 한 프레임으로 묶어 차원 값을 한 번만 보낸다
+    out = bytearray()
+    i = 0
+    while i < len(events):
+        dims = (events[i]["device_id"], events[i]["line_id"], events[i].get("station_id"))
+        j = i + 1
+        while (j < len(events) and j - i < MAX_COUNT
+               and (events[j]["device_id"], events[j]["line_id"], events[j].get("station_id")) == dims):
+            j += 1
+        _put_frame(out, dims, events[i:j])
+        i = j
+    return bytes(out)
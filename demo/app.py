@@ -1,9 +1,11 @@
 import os
 import sqlite3
 import csv
+import threading
+from collections import deque
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -73,27 +75,114 @@ def get_current_shift(dt_obj):
     else:
         return 'NIGHT'
 
-# 데이터 조회 로직 
-def get_data():
-    if not os.path.exists(DB_PATH):
-        return 0, 0, 0, 0, []
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT COUNT(*) FROM raw_events")
-        total = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM raw_events WHERE is_pass = 0")
-        fail = cursor.fetchone()[0]
-        cursor.execute("SELECT id, torque_val FROM raw_events ORDER BY id DESC LIMIT 10")
-        recent_data = cursor.fetchall()
-        recent_data.reverse()
-        pass_units = total - fail
-        rate = round((fail / total * 100), 2) if total > 0 else 0
-        return total, pass_units, fail, rate, recent_data
-    except:
-        return 0, 0, 0, 0, []
-    finally:
-        conn.close()
+# 실시간 집계: 시작할 때 한 번만 DB 에서 읽고 이후에는 메모리에서 누적
+ALL_LINES = "*"
+RECENT_SIZE = 10
+BROADCAST_INTERVAL = 0.25
+
+class LineCounters:
+    def __init__(self):
+        self.total = 0
+        self.fail = 0
+        self.recent = deque(maxlen=RECENT_SIZE)
+        self.pending = []
+
+    def snapshot(self, drain=False):
+        pass_units = self.total - self.fail
+        rate = round((self.fail / self.total * 100), 2) if self.total > 0 else 0
+        new_logs = self.pending if drain else []
+        if drain:
+            self.pending = []
+        return {'total': self.total, 'pass': pass_units, 'fail': self.fail, 'rate': rate,
+                'new_logs': new_logs}
+
+class LiveCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lines = {ALL_LINES: LineCounters()}
+        self.dirty = set()
+
+    def _line(self, line_id):
+        c = self.lines.get(line_id)
+        if c is None:
+            c = self.lines[line_id] = LineCounters()
+        return c
+
+    def seed(self):
+        if not os.path.exists(DB_PATH):
+            return
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            rows = conn.execute("""
+                SELECT line_id, COUNT(*), SUM(CASE WHEN is_pass = 0 THEN 1 ELSE 0 END)
+                FROM raw_events GROUP BY line_id
+            """).fetchall()
+            recent = conn.execute("""
+                SELECT line_id, id, torque_val FROM (
+                    SELECT line_id, id, torque_val,
+                           ROW_NUMBER() OVER (PARTITION BY line_id ORDER BY id DESC) AS rn
+                    FROM raw_events
+                ) WHERE rn <= ? ORDER BY id
+            """, (RECENT_SIZE,)).fetchall()
+            latest = conn.execute(
+                "SELECT id, torque_val FROM raw_events ORDER BY id DESC LIMIT ?", (RECENT_SIZE,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        with self.lock:
+            for line_id, total, fail in rows:
+                for c in (self._line(line_id), self.lines[ALL_LINES]):
+                    c.total += total
+                    c.fail += fail or 0
+            for line_id, id_, torque in recent:
+                self._line(line_id).recent.append((str(id_), torque))
+            for id_, torque in reversed(latest):
+                self.lines[ALL_LINES].recent.append((str(id_), torque))
+
+    def record(self, line_id, torque, is_pass, label):
+        with self.lock:
+            for key in (line_id, ALL_LINES):
+                c = self._line(key)
+                c.total += 1
+                if is_pass == 0:
+                    c.fail += 1
+                c.recent.append((label, torque))
+                c.pending.append({'torque': torque, 'id': label})
+                del c.pending[:-RECENT_SIZE]
+                self.dirty.add(key)
+
+    def snapshot(self, line_id):
+        with self.lock:
+            c = self.lines.get(line_id) or LineCounters()
+            return c.snapshot(), list(c.recent)
+
+    def drain(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            return {key: self.lines[key].snapshot(drain=True) for key in dirty}
+
+counters = LiveCounters()
+
+def room_for(line_id):
+    return f"line:{line_id}"
+
+def broadcast_loop():
+    # 이벤트마다 방송하지 않고 일정 주기로 바뀐 라인만 해당 룸에 한 번씩 전송
+    while True:
+        socketio.sleep(BROADCAST_INTERVAL)
+        for line_id, payload in counters.drain().items():
+            socketio.emit('update_data', payload, to=room_for(line_id))
+
+@socketio.on('subscribe')
+def on_subscribe(data):
+    line_id = (data or {}).get('line_id') or ALL_LINES
+    join_room(room_for(line_id))
+
+@socketio.on('unsubscribe')
+def on_unsubscribe(data):
+    line_id = (data or {}).get('line_id') or ALL_LINES
+    leave_room(room_for(line_id))
 
 @app.route('/api/log', methods=['POST'])
 def receive_log():
@@ -144,12 +233,8 @@ def receive_log():
         conn.commit()
         conn.close()
 
-        # 대시보드 실시간 업데이트
-        total, pass_units, fail, rate, recent_data = get_data()
-        socketio.emit('update_data', {
-            'total': total, 'pass': pass_units, 'fail': fail, 'rate': rate,
-            'new_log': {'torque': torque, 'id': timestamp.split()[-1]}
-        })
+        # 대시보드 실시간 업데이트 (broadcast_loop 가 주기적으로 묶어서 전송)
+        counters.record(line_id, torque, is_pass, timestamp.split()[-1])
 
         print(f"✅ Logged: {unit_id} | Shift: {current_shift} | Station: {station}")
         return jsonify({"status": "success"}), 200
@@ -190,10 +275,14 @@ def control_machine():
 
 @app.route('/')
 def dashboard():
-    total, pass_units, fail, rate, recent_data = get_data()
-    chart_data = [["ID", "Torque"]] + [[str(d[0]), d[1]] for d in recent_data]
-    return render_template('dashboard.html', total=total, pass_units=pass_units, fail=fail, rate=rate, chart_data=chart_data)
+    line_id = request.args.get('line', ALL_LINES)
+    stats, recent_data = counters.snapshot(line_id)
+    chart_data = [["ID", "Torque"]] + [[d[0], d[1]] for d in recent_data]
+    return render_template('dashboard.html', total=stats['total'], pass_units=stats['pass'],
+                           fail=stats['fail'], rate=stats['rate'], chart_data=chart_data, line_id=line_id)
 
 if __name__ == '__main__':
     init_db()
+    counters.seed()
+    socketio.start_background_task(broadcast_loop)
     socketio.run(app, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config import Config
+from app.storage import connect
+from app import archive
+from app.shifts import from_spec
+
+def cmd_export(args):
+    # 닫힌 일자만 내보낸다. edge 장비가 CLIENT_TS_MAX_AGE_DAYS 까지 지난 ts 로 늦게 올리므로
+    # 그 기간 안의 일자는 아직 이벤트가 더 들어올 수 있어 내보내지 않는다
+    keep_days = max(args.keep_days, Config.CLIENT_TS_MAX_AGE_DAYS)
+    last = min(args.to or date.today(), date.today() - timedelta(days=keep_days + 1))
+    if args.to is not None and args.to > last:
+        print(f"[archive] days after {last} can still receive late events "
+              f"(CLIENT_TS_MAX_AGE_DAYS={Config.CLIENT_TS_MAX_AGE_DAYS}), not exported")
+    first = args.from_
+    if first is None:
+        conn = connect(args.db, Config.STORAGE_PRAGMAS)
+        row = conn.execute("SELECT date(MIN(ts), 'unixepoch', 'localtime') FROM raw_events").fetchone()
+        conn.close()
+        if row[0] is None:
+            print("[archive] raw_events is empty")
+            return
+        first = date.fromisoformat(row[0])
+
+    archive.clean_stale(args.root)
+    done = set(archive.archived_days(args.root))
+    conn = connect(args.db, Config.STORAGE_PRAGMAS)
+    try:
+        d = first
+        while d <= last:
+            if d in done and not args.overwrite:
+                d += timedelta(days=1)
+                continue
+            n = archive.export_day(conn, args.root, d)
+            print(f"[archive] {d} rows={n}")
+            d += timedelta(days=1)
+    finally:
+        conn.close()
+
+def cmd_kpi(args):
+    calendar = from_spec(Config.SHIFTS, Config.HOLIDAYS)
+    rows = archive.scan_kpi(args.root, args.from_, args.to, calendar, line_id=args.line)
+    print(json.dumps(rows, ensure_ascii=False, indent=2))
+
+def main():
+    ap = argparse.ArgumentParser(description="columnar archive of closed raw_events days")
+    ap.add_argument("--db", default=Config.DB_PATH)
+    ap.add_argument("--root", default=Config.ARCHIVE_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("export", help="export closed days of raw_events to .npy columns")
+    p.add_argument("--from", dest="from_", type=date.fromisoformat)
+    p.add_argument("--to", type=date.fromisoformat)
+    p.add_argument("--keep-days", type=int, default=0,
+                   help="leave the most recent N closed days in SQLite only "
+                        "(never fewer than CLIENT_TS_MAX_AGE_DAYS, since those days still accept late events)")
+    p.add_argument("--overwrite", action="store_true")
+
+    p = sub.add_parser("kpi", help="shift KPIs for a date range from the archive")
+    p.add_argument("--from", dest="from_", type=date.fromisoformat, required=True)
+    p.add_argument("--to", type=date.fromisoformat, required=True)
+    p.add_argument("--line")
+
+    args = ap.parse_args()
+    {"export": cmd_export, "kpi": cmd_kpi}[args.cmd](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app import create_app
+from app.cache import LRUCache
+from app.events import insert_events, to_row
+from app.storage import PROFILES, connect
+import run_worker
+from simulator import DeviceState, next_events
+
+# ingest → aggregate → query 구간을 같은 조건으로 재현해 커밋 간 비교하는 벤치마크
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+BASE_TS = int(datetime(2026, 1, 1).timestamp())
+HISTORY_DAYS = 30
+SEED_CHUNK = 50_000
+
+def init_schema(conn):
+    for name in ("schema_raw_events.sql", "schema.sql"):
+        with open(os.path.join(ROOT, "app", name), encoding="utf-8") as f:
+            conn.executescript(f.read())
+
+def seed_events(n, seed, start_ts, span_sec, lines=2, stations=4):
+    # 시뮬레이터와 같은 이벤트 모델을 고정 시드로 돌려 항상 같은 행을 만든다
+    rng = random.Random(seed)
+    devices = [
+        (f"bench-L{l}-ST{s}", f"LINE-{l}", f"ST{s}", DeviceState(unit_prefix=f"L{l}S{s}"))
+        for l in range(1, lines + 1) for s in range(1, stations + 1)
+    ]
+    i = 0
+    while True:
+        for device, line, station, state in devices:
+            for ev in next_events(rng, state, device, line, station):
+                if i >= n:
+                    return
+                yield to_row(ev, start_ts + (i * span_sec) // n)
+                i += 1
+
+def seed_db(path, n, seed):
+    conn = connect(path, PROFILES["bulk"])
+    init_schema(conn)
+    t0 = time.perf_counter()
+    chunk = []
+    for row in seed_events(n, seed, BASE_TS, HISTORY_DAYS * 86400):
+        chunk.append(row)
+        if len(chunk) >= SEED_CHUNK:
+            insert_events(conn, chunk)
+            conn.commit()
+            chunk = []
+    if chunk:
+        insert_events(conn, chunk)
+        conn.commit()
+    conn.close()
+    return time.perf_counter() - t0
+
+def quiet(fn, *args):
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        return fn(*args)
+
+def bench_worker(path, increments, reps, seed):
+    run_worker.DB_PATH = path
+    t0 = time.perf_counter()
+    while not quiet(run_worker.aggregate_incremental_once):
+        pass
+    result = {"full_catch_up_sec": round(time.perf_counter() - t0, 4)}
+
+    conn = connect(path, PROFILES["default"])
+    end_ts = BASE_TS + HISTORY_DAYS * 86400
+    for inc in increments:
+        times = []
+        for r in range(reps):
+            rows = list(seed_events(inc, seed + 1000 + r, end_ts + r * 60, 60))
+            insert_events(conn, rows)
+            conn.commit()
+            t0 = time.perf_counter()
+            while not quiet(run_worker.aggregate_incremental_once):
+                pass
+            times.append(time.perf_counter() - t0)
+        result[f"tick_{inc}_ms"] = summarize(times)
+    conn.close()
+    return result
+
+def bench_ingest(path, n_single, n_batches, batch_size, seed):
+    app = create_app({"DB_PATH": path})
+    client = app.test_client()
+    events = [
+        dict(zip(("device_id", "line_id", "station_id", "event_type", "unit_id", "cycle_time"),
+                 (r[1], r[2], r[3], r[4], r[5], r[6])))
+        for r in seed_events(n_single + n_batches * batch_size, seed + 7, BASE_TS, 3600)
+    ]
+
+    t0 = time.perf_counter()
+    for ev in events[:n_single]:
+        client.post("/api/events", json=ev)
+    single = time.perf_counter() - t0
+
+    rest = events[n_single:]
+    t0 = time.perf_counter()
+    for i in range(n_batches):
+        client.post("/api/events/batch", json=rest[i * batch_size:(i + 1) * batch_size])
+    batch = time.perf_counter() - t0
+
+    return {
+        "single_events_per_sec": round(n_single / single, 1),
+        "batch_events_per_sec": round(n_batches * batch_size / batch, 1) if n_batches else None,
+        "batch_size": batch_size,
+    }
+
+def bench_query(path, n):
+    app = create_app({"DB_PATH": path})
+    client = app.test_client()
+    date = datetime.fromtimestamp(BASE_TS + (HISTORY_DAYS - 1) * 86400).strftime("%Y-%m-%d")
+    url = f"/api/kpi/today?date={date}"
+
+    # 크기 0 캐시 = 매 요청 SQLite 조회
+    cache = app.extensions["kpi_cache"]
+    app.extensions["kpi_cache"] = LRUCache(0)
+    cold = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        client.get(url)
+        cold.append(time.perf_counter() - t0)
+
+    app.extensions["kpi_cache"] = cache
+    warm = []
+    etag = None
+    for _ in range(n):
+        t0 = time.perf_counter()
+        r = client.get(url)
+        warm.append(time.perf_counter() - t0)
+        etag = r.headers.get("ETag")
+
+    revalidate = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        client.get(url, headers={"If-None-Match": etag})
+        revalidate.append(time.perf_counter() - t0)
+
+    return {
+        "uncached_ms": summarize(cold),
+        "cached_ms": summarize(warm),
+        "not_modified_ms": summarize(revalidate),
+    }
+
+def summarize(seconds):
+    ms = sorted(x * 1000 for x in seconds)
+    return {
+        "p50": round(statistics.median(ms), 3),
+        "p99": round(ms[min(len(ms) - 1, int(0.99 * (len(ms) - 1) + 0.5))], 3),
+        "mean": round(statistics.fmean(ms), 3),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    ap = argparse.ArgumentParser(description="ingest -> aggregate -> query benchmark")
+    ap.add_argument("--sizes", default="10k,1m", help=f"comma separated: {','.join(SIZES)}")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--increments", default="100,1000", help="events per worker tick to time")
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--ingest-events", type=int, default=2000)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--batches", type=int, default=20)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--workdir", help="keep seeded DBs here (default: temp dir)")
+    ap.add_argument("--out", help="result JSON path (default: instance/bench-<commit>.json)")
+    args = ap.parse_args()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": {},
+    }
+    increments = [int(x) for x in args.increments.split(",")]
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sf-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    for size in args.sizes.split(","):
+        n = SIZES[size]
+        path = os.path.join(workdir, f"bench-{size}.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+        print(f"[bench] {size}: seeding {n} rows")
+        res = {"rows": n, "seed_sec": round(seed_db(path, n, args.seed), 3)}
+        print(f"[bench] {size}: worker")
+        res["worker"] = bench_worker(path, increments, args.reps, args.seed)
+        print(f"[bench] {size}: query")
+        res["kpi_today"] = bench_query(path, args.queries)
+        print(f"[bench] {size}: ingest")
+        res["ingest"] = bench_ingest(path, args.ingest_events, args.batches, args.batch_size, args.seed)
+        report["results"][size] = res
+
+    out = args.out or os.path.join("instance", f"bench-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"[bench] wrote {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import os
+import gzip
+import json
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import threading
+
+import requests
+
+# 라즈베리파이 수집기용 store-and-forward 에이전트
+# 이벤트는 먼저 로컬 SQLite(WAL) 큐에 붙여 쓰고, 업로더가 gzip NDJSON 묶음으로 /api/events/batch 에 보낸다
+# 서버 장애/네트워크 단절 중에는 큐에 쌓아 두었다가 지수 백오프로 재시도, 전달 커서로 재시작 후에도 이어서 보낸다
+# event_id 를 붙여 두므로 커밋 직후 끊겨 같은 묶음을 다시 보내도 서버가 중복을 걸러낸다
+# ts(발생 시각)도 큐에 넣을 때 찍어 두어, 늦게 올라가도 원래 교대/시간 버킷으로 집계된다
+# 서버 패키지(app) 를 import 하지 않으므로 파이에는 이 파일과 requests 만 있으면 된다
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS delivery_cursor (
+  name TEXT PRIMARY KEY,
+  seq INTEGER NOT NULL
+);
+"""
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # SD 카드 쓰기를 줄이기 위해 커밋마다 fsync 하지 않는다 (WAL 이라 전원 차단 시에도 DB 는 깨지지 않음)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class EdgeQueue:
+
+    def __init__(self, path, cursor="server"):
+        self.path = path
+        self.cursor = cursor
+        self.conn = _connect(path)
+        self.lock = threading.Lock()
+
+    def append(self, events):
+        # 한 번 호출 = 한 트랜잭션. 센서 루프에서는 여러 건을 모아 넘기면 SD 카드 쓰기가 줄어든다
+        rows = []
+        now = int(time.time())
+        for ev in events:
+            ev.setdefault("event_id", uuid.uuid4().hex)
+            ev.setdefault("ts", now)
+            rows.append((json.dumps(ev, ensure_ascii=False, separators=(",", ":")),))
+        with self.lock:
+            self.conn.executemany("INSERT INTO outbox (body) VALUES (?)", rows)
+            self.conn.commit()
+        return len(rows)
+
+    def delivered(self):
+        with self.lock:
+            row = self.conn.execute("SELECT seq FROM delivery_cursor WHERE name=?", (self.cursor,)).fetchone()
+        return row[0] if row else 0
+
+    def pending(self):
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT COUNT(*) FROM outbox
+                WHERE seq > COALESCE((SELECT seq FROM delivery_cursor WHERE name=?), 0)
+            """, (self.cursor,)).fetchone()
+        return row[0]
+
+    def peek(self, limit):
+        with self.lock:
+            return self.conn.execute("""
+                SELECT seq, body FROM outbox
+                WHERE seq > COALESCE((SELECT seq FROM delivery_cursor WHERE name=?), 0)
+                ORDER BY seq LIMIT ?
+            """, (self.cursor, limit)).fetchall()
+
+    def ack(self, seq):
+        # 커서를 옮기고 전달이 끝난 앞부분은 지운다 (큐 파일이 계속 커지지 않도록)
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO delivery_cursor (name, seq) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET seq=MAX(seq, excluded.seq)
+            """, (self.cursor, seq))
+            self.conn.execute("""
+                DELETE FROM outbox
+                WHERE seq <= (SELECT MIN(seq) FROM delivery_cursor)
+            """)
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class Uploader:
+
+    def __init__(self, queue, base_url, batch_size=500, timeout=10,
+                 backoff_min=1.0, backoff_max=60.0, idle_sec=1.0):
+        self.queue = queue
+        self.url = f"{base_url.rstrip('/')}/api/events/batch"
+        self.batch_size = batch_size
+        # 413 을 받으면 줄어드는 실제 묶음 크기
+        self.limit = batch_size
+        self.timeout = timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.idle_sec = idle_sec
+        self.session = requests.Session()
+        self._stop = threading.Event()
+        self._thread = None
+        self.failures = 0
+
+    def send_once(self):
+        # 한 묶음 전송. 보낸 건수를 돌려주고, 실패하면 예외 (큐는 그대로라 다음 시도에 같은 묶음을 다시 보낸다)
+        batch = self.queue.peek(self.limit)
+        if not batch:
+            return 0
+        while True:
+            body = gzip.compress("\n".join(b for _, b in batch).encode("utf-8"), compresslevel=6)
+            r = self.session.post(self.url, data=body, timeout=self.timeout, headers={
+                "Content-Type": "application/x-ndjson",
+                "Content-Encoding": "gzip",
+            })
+            if r.status_code != 413 or len(batch) == 1:
+                break
+            # 서버 본문 크기 제한: 묶음을 반으로 줄여 앞부분부터 보내고, 이후 묶음도 그 크기로 보낸다
+            self.limit = max(1, len(batch) // 2)
+            batch = batch[:self.limit]
+            print(f"[edge] batch too large for server, retrying with {self.limit} events")
+
+        try:
+            result = r.json()
+        except ValueError:
+            result = {}
+        if not isinstance(result, dict):
+            result = {}
+        # 2xx, 또는 서버가 레코드별 results 로 거부 사유를 알려 준 400/422 만 전달 완료로 본다
+        # 그 밖의 응답(5xx, 408/429, 본문 전체 거부, 프록시 오류 등)은 큐를 지우지 않고 백오프 후 재시도
+        if not (200 <= r.status_code < 300 or (r.status_code in (400, 422) and "results" in result)):
+            raise RuntimeError(f"POST failed {r.status_code}: {r.text[:200]}")
+        if result.get("rejected"):
+            # 형식 오류로 거부된 레코드는 다시 보내도 같은 결과이므로 기록만 하고 넘어간다
+            print(f"[edge] server rejected {result['rejected']} of {len(batch)} events")
+        self.queue.ack(batch[-1][0])
+        return len(batch)
+
+    def backoff(self):
+        # 지수 백오프 + full jitter: 여러 장비가 동시에 재접속해 서버를 몰아치지 않도록
+        cap = min(self.backoff_max, self.backoff_min * (2 ** min(self.failures, 16)))
+        return random.uniform(self.backoff_min, cap)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.send_once()
+            except (requests.RequestException, RuntimeError, ValueError) as e:
+                self.failures += 1
+                wait = self.backoff()
+                print(f"[edge] upload failed ({e}), retry in {wait:.1f}s, pending={self.queue.pending()}")
+                self._stop.wait(wait)
+                continue
+            self.failures = 0
+            if sent < self.limit:
+                self._stop.wait(self.idle_sec)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="edge-uploader", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush_timeout=5.0):
+        # 종료 전 남은 이벤트를 한 번 더 보내 본다. 못 보낸 것은 큐에 남아 다음 실행 때 나간다
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        deadline = time.monotonic() + flush_timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.send_once() == 0:
+                    break
+            except (requests.RequestException, RuntimeError, ValueError):
+                break
+
+def main():
+    ap = argparse.ArgumentParser(description="store-and-forward uploader for a local edge queue")
+    ap.add_argument("--queue", default=os.path.join(os.getenv("TARGET_DIR", "./data"), "edge_queue.db"))
+    ap.add_argument("--base", default="http://localhost:5000", help="server base url")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--backoff-max", type=float, default=60.0)
+    args = ap.parse_args()
+
+    queue = EdgeQueue(args.queue)
+    up = Uploader(queue, args.base, batch_size=args.batch_size, backoff_max=args.backoff_max)
+    print(f"[edge] queue={args.queue} base={args.base} pending={queue.pending()}")
+    try:
+        up.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,86 @@
-import os, sqlite3
+import os, re, sys
 
-DB_PATH = os.path.join("instance", "smartfactory.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config import Config
+from app.storage import connect
+from app.partitions import is_partitioned
+
+DB_PATH = Config.DB_PATH
 SCHEMA_PATH = os.path.join("app", "schema.sql")
+# 파티션 모드에서는 raw_events 가 뷰이므로 단일 테이블 DDL 을 건너뛴다
+RAW_EVENTS_SCHEMA_PATH = os.path.join("app", "schema_raw_events.sql")
+
+# CREATE TABLE IF NOT EXISTS 로는 기존 테이블에 컬럼이 추가되지 않으므로 직접 보강
+ADDED_COLUMNS = {
+    "summary_shift": [
+        ("ct_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("ct_sum", "REAL NOT NULL DEFAULT 0"),
+        ("ct_sumsq", "REAL NOT NULL DEFAULT 0"),
+        ("ct_min", "REAL"),
+        ("ct_max", "REAL"),
+    ],
+}
+
+def add_missing_columns(conn):
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+# 선언 타입이 바뀐 컬럼: SQLite 는 ALTER COLUMN 이 없으므로 테이블을 새로 만들어 옮긴다
+# stop_minutes 는 STOP_MINUTE 건수(정수)에서 정지 구간 길이(분, 소수)로 바뀌었다
+RETYPED_COLUMNS = {
+    "summary_shift": [("stop_minutes", "INTEGER", "REAL")],
+    "rollup_minute": [("stop_minutes", "INTEGER", "REAL")],
+    "rollup_hour": [("stop_minutes", "INTEGER", "REAL")],
+    "rollup_day": [("stop_minutes", "INTEGER", "REAL")],
+    "summary_changes": [("stop_delta", "INTEGER", "REAL")],
+}
+
+def retype_columns(conn):
+    for table, columns in RETYPED_COLUMNS.items():
+        types = {r[1]: r[2].upper() for r in conn.execute(f"PRAGMA table_info({table})")}
+        todo = [(name, old, new) for name, old, new in columns if types.get(name) == old]
+        if not todo:
+            continue
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()[0]
+        for name, old, new in todo:
+            sql = re.sub(rf"\b{name}\s+{old}\b", f"{name} {new}", sql, count=1)
+        indexes = [r[0] for r in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,)
+        )]
+        conn.execute("BEGIN")
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}__old")
+        conn.execute(sql)
+        conn.execute(f"INSERT INTO {table} SELECT * FROM {table}__old")
+        conn.execute(f"DROP TABLE {table}__old")
+        for index_sql in indexes:
+            conn.execute(index_sql)
+        conn.commit()
+        print(f"retyped {table}: {', '.join(f'{n} {old} -> {new}' for n, old, new in todo)}")
+
+# 중복 판정 키가 event_id 에서 (device_id, event_id) 로 바뀌었다. 옛 행에는 장비 정보가 없어
+# 옮길 수 없으므로 테이블을 비우고 새로 만든다 (보관 기간 동안의 재전송 판정만 잃는다)
+def rekey_dedupe(conn):
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(ingest_dedupe)")}
+    if columns and "device_id" not in columns:
+        conn.execute("DROP TABLE ingest_dedupe")
+        conn.commit()
+        print("rebuilt ingest_dedupe with (device_id, event_id) key")
 
 os.makedirs("instance", exist_ok=True)
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH, Config.STORAGE_PRAGMAS)
+if not is_partitioned(conn):
+    with open(RAW_EVENTS_SCHEMA_PATH, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+rekey_dedupe(conn)
 with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
     conn.executescript(f.read())
+add_missing_columns(conn)
 conn.commit()
+retype_columns(conn)
 conn.close()
 
 print("DB initialized:", DB_PATH)
@@ -0,0 +1,47 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config import Config
+from app.storage import PROFILES, connect
+from app import csv_import
+
+# 한 번에 이만큼 이상 남은 파일은 인덱스를 내렸다가 다시 만드는 편이 빠르다
+DEFER_INDEX_BYTES = 256 * 1024 * 1024
+
+def main():
+    ap = argparse.ArgumentParser(description="stream CSV production reports into raw_events (resumable)")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--db", default=Config.DB_PATH)
+    ap.add_argument("--mapping", default="factory_test",
+                    help=f"preset ({', '.join(csv_import.PRESETS)}) or JSON mapping file")
+    ap.add_argument("--profile", default="bulk", choices=sorted(PROFILES))
+    ap.add_argument("--commit-rows", type=int, default=200000)
+    ap.add_argument("--defer-indexes", choices=["auto", "yes", "no"], default="auto")
+    ap.add_argument("--restart", action="store_true", help="ignore the saved offset and load from the top")
+    args = ap.parse_args()
+
+    mapping = csv_import.load_mapping(args.mapping)
+    conn = connect(args.db, PROFILES[args.profile])
+    try:
+        for path in args.paths:
+            path = os.path.abspath(path)
+            if args.restart:
+                conn.execute("DELETE FROM import_checkpoint WHERE path=?", (path,))
+                conn.commit()
+            offset = csv_import.load_checkpoint(conn, path)[0]
+            remaining = os.path.getsize(path) - offset
+            defer = args.defer_indexes == "yes" or (args.defer_indexes == "auto" and remaining >= DEFER_INDEX_BYTES)
+            loaded, rejected = csv_import.load(
+                conn, path, mapping,
+                partition=Config.RAW_EVENTS_PARTITION,
+                commit_rows=args.commit_rows,
+                defer_indexes=defer,
+            )
+            print(f"[csv] done {path} loaded={loaded} rejected={rejected}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
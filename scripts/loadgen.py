@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app import wire
+from simulator import DeviceState, next_events
+
+# 라인 N × 스테이션 M × 장비 K 를 동시에 흉내내는 부하 발생기
+# 프로세스마다 장비 묶음을 맡고, 장비 하나 = 스레드 하나 = keep-alive 세션 하나
+
+def target_rate(profile, t, args):
+    # 시각 t(초)에서의 전체 목표 이벤트/초
+    if profile == "ramp":
+        return args.rate * min(1.0, max(t, 0.0) / max(args.ramp_sec, 0.001))
+    if profile == "burst":
+        in_burst = (t % args.burst_every) < args.burst_len
+        return args.rate * (args.burst_factor if in_burst else 1.0)
+    return args.rate
+
+def run_device(device, line, station, n_devices, args, seed, start_at):
+    rng = random.Random(seed)
+    state = DeviceState(unit_prefix=device)
+    session = requests.Session()
+    single_url = f"{args.base.rstrip('/')}/api/events"
+    batch_url = f"{args.base.rstrip('/')}/api/events/batch"
+
+    sent = errors = 0
+    latencies = []
+    pending = []
+    end = start_at + args.duration
+
+    def send(events):
+        nonlocal sent, errors
+        t0 = time.perf_counter()
+        try:
+            url = batch_url if args.batch > 1 else single_url
+            if args.format == "binary":
+                r = session.post(url, data=wire.encode(events), timeout=args.timeout,
+                                 headers={"Content-Type": wire.CONTENT_TYPE})
+            elif args.batch > 1:
+                r = session.post(url, json=events, timeout=args.timeout)
+            else:
+                r = session.post(url, json=events[0], timeout=args.timeout)
+            accepted = 0
+            if r.status_code < 400:
+                # 배치는 응답의 accepted, 단건은 duplicate 여부로 실제 적재된 건수를 센다 (거부/중복은 오류로)
+                result = r.json()
+                if "accepted" in result:
+                    accepted = result["accepted"]
+                elif not result.get("duplicate"):
+                    accepted = len(events)
+        except (requests.RequestException, ValueError):
+            accepted = 0
+        latencies.append(time.perf_counter() - t0)
+        sent += accepted
+        errors += len(events) - accepted
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    next_at = start_at
+    while True:
+        now = time.time()
+        if now >= end:
+            break
+        # 장비당 목표 속도에 맞춰 다음 사이클 시각을 절대 시간으로 예약
+        rate = target_rate(args.profile, now - start_at, args) / n_devices
+        if rate <= 0:
+            time.sleep(0.05)
+            next_at = time.time()
+            continue
+        if next_at > now:
+            time.sleep(next_at - now)
+        next_at += 1.0 / rate
+
+        for ev in next_events(rng, state, device, line, station):
+            if args.batch > 1:
+                pending.append(ev)
+                if len(pending) >= args.batch:
+                    send(pending)
+                    pending = []
+            else:
+                send([ev])
+
+    if pending:
+        send(pending)
+    session.close()
+    return sent, errors, latencies
+
+def run_process(devices, n_devices, args, start_at):
+    with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+        futures = [
+            pool.submit(run_device, device, line, station, n_devices, args, seed, start_at)
+            for device, line, station, seed in devices
+        ]
+        results = [f.result() for f in futures]
+    sent = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    latencies = [x for r in results for x in r[2]]
+    return sent, errors, latencies
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    i = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+def main():
+    ap = argparse.ArgumentParser(description="Smart Factory load generator (lines x stations x devices)")
+    ap.add_argument("--base", default="http://localhost:5000")
+    ap.add_argument("--lines", type=int, default=2)
+    ap.add_argument("--stations", type=int, default=4)
+    ap.add_argument("--devices", type=int, default=2, help="devices per station")
+    ap.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds")
+    ap.add_argument("--rate", type=float, default=200.0, help="target cycles per second across all devices")
+    ap.add_argument("--profile", choices=["steady", "ramp", "burst"], default="steady")
+    ap.add_argument("--ramp-sec", type=float, default=10.0)
+    ap.add_argument("--burst-every", type=float, default=20.0)
+    ap.add_argument("--burst-len", type=float, default=5.0)
+    ap.add_argument("--burst-factor", type=float, default=5.0)
+    ap.add_argument("--batch", type=int, default=1, help="events per POST (>1 uses /api/events/batch)")
+    ap.add_argument("--format", choices=["json", "binary"], default="json",
+                    help=f"request body encoding (binary = {wire.CONTENT_TYPE})")
+    ap.add_argument("--timeout", type=float, default=5.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--json", help="write the report to this file")
+    args = ap.parse_args()
+
+    devices = []
+    for l in range(1, args.lines + 1):
+        for st in range(1, args.stations + 1):
+            for k in range(1, args.devices + 1):
+                device = f"sim-L{l}-ST{st}-{k:02d}"
+                devices.append((device, f"LINE-{l}", f"ST{st}", args.seed * 100003 + len(devices)))
+    n_devices = len(devices)
+    n_proc = max(1, min(args.processes, n_devices))
+    chunks = [devices[i::n_proc] for i in range(n_proc)]
+
+    print(f"[load] devices={n_devices} processes={n_proc} profile={args.profile} "
+          f"rate={args.rate}/s duration={args.duration}s batch={args.batch} format={args.format}")
+
+    start_at = time.time() + 1.0
+    with ProcessPoolExecutor(max_workers=n_proc) as pool:
+        results = list(pool.map(run_process, chunks, [n_devices] * n_proc,
+                                [args] * n_proc, [start_at] * n_proc))
+    elapsed = max(time.time() - start_at, 0.001)
+
+    sent = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    lat = sorted(x for r in results for x in r[2])
+    report = {
+        "devices": n_devices,
+        "profile": args.profile,
+        "batch": args.batch,
+        "elapsed_sec": round(elapsed, 3),
+        "events_ok": sent,
+        "events_failed": errors,
+        "events_per_sec": round(sent / elapsed, 1),
+        "requests": len(lat),
+        "latency_ms": {
+            f"p{p}": None if not lat else round(percentile(lat, p) * 1000, 2)
+            for p in (50, 90, 95, 99)
+        },
+    }
+    report["latency_ms"]["max"] = None if not lat else round(lat[-1] * 1000, 2)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
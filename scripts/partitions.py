@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import argparse
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config import Config
+from app.storage import connect
+from app import leases, partitions
+
+def cmd_enable(conn, args):
+    partitions.enable(conn, args.period)
+    conn.commit()
+    print(f"[partitions] enabled period={args.period}, partitions={len(partitions.list_partitions(conn))}")
+    print(f"[partitions] set RAW_EVENTS_PARTITION={args.period} for the API process")
+
+def cmd_list(conn, args):
+    if not partitions.is_partitioned(conn):
+        print("[partitions] raw_events is a single table")
+        return
+    for name in partitions.list_partitions(conn):
+        n, lo, hi = conn.execute(f"SELECT COUNT(*), MIN(id), MAX(id) FROM {name}").fetchone()
+        print(f"{name:<24} rows={n:<10} ids={lo}..{hi}")
+
+def cmd_ahead(conn, args):
+    # 자정 직후 첫 적재가 DDL 을 기다리지 않도록 다음 기간 파티션을 미리 생성
+    now = int(time.time())
+    names = {partitions.partition_name(now + d * 86400, args.period) for d in range(args.days + 1)}
+    created = partitions.ensure_partitions(conn, names)
+    conn.commit()
+    print(f"[partitions] created={created}")
+
+def cmd_retention(conn, args):
+    cutoff = date.today() - timedelta(days=args.keep_days)
+    # 워커가 아직 집계하지 않은 파티션은 --force 없이는 지우지 않는다
+    max_id = None if args.force else leases.aggregated_through(conn)
+    dropped = partitions.drop_before(conn, cutoff, args.period, max_id=max_id)
+    conn.commit()
+    print(f"[partitions] cutoff={cutoff}, dropped={dropped}")
+
+def main():
+    ap = argparse.ArgumentParser(description="raw_events time partitions")
+    ap.add_argument("--db", default=Config.DB_PATH)
+    ap.add_argument("--period", default=Config.RAW_EVENTS_PARTITION or "day", choices=partitions.PERIODS)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("enable", help="migrate the single raw_events table into partitions")
+    sub.add_parser("list", help="show partitions and row counts")
+    p = sub.add_parser("ahead", help="pre-create upcoming partitions")
+    p.add_argument("--days", type=int, default=1)
+    p = sub.add_parser("retention", help="drop whole partitions older than --keep-days")
+    p.add_argument("--keep-days", type=int, required=True)
+    p.add_argument("--force", action="store_true", help="drop even if the worker has not aggregated them")
+
+    args = ap.parse_args()
+    conn = connect(args.db, Config.STORAGE_PRAGMAS)
+    try:
+        {
+            "enable": cmd_enable,
+            "list": cmd_list,
+            "ahead": cmd_ahead,
+            "retention": cmd_retention,
+        }[args.cmd](conn, args)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
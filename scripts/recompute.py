@@ -0,0 +1,181 @@
+import os
+import sys
+import sqlite3
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config import Config
+from app.storage import connect
+from app.shifts import from_spec
+from app import downtime, leases
+from app.summary import apply_deltas, bucket_keys, delta_for, fold_event, publish_changes
+
+CALENDAR = from_spec(Config.SHIFTS, Config.HOLIDAYS)
+# 계산 중에 워커가 이 (일자, 라인) 에 닿는 이벤트를 반영하면 새 체크포인트로 다시 계산한다. 이 횟수를 넘기면 잠금 안에서 계산
+MAX_ATTEMPTS = 5
+
+# 지난 기간 summary_shift 를 (일자, 라인) 단위로 raw_events 에서 다시 계산해 통째로 바꿔 끼운다
+# 각 파티션은 그 라인 워커 체크포인트까지의 이벤트만 집계하므로, 교체 후 워커 증분과 겹치거나 빠지지 않는다
+
+def open_stop_at(conn, line_id, lo, bound):
+    # lo 시점에 열려 있던 정지: 마지막 STOP_END 이후 첫 STOP_START
+    row = conn.execute("""
+        SELECT ts FROM raw_events
+        WHERE line_id=? AND ts < ? AND id <= ? AND event_type='STOP_END'
+        ORDER BY ts DESC LIMIT 1
+    """, (line_id, lo, bound)).fetchone()
+    last_end = row["ts"] if row is not None else -1
+    row = conn.execute("""
+        SELECT ts, stop_reason FROM raw_events
+        WHERE line_id=? AND ts > ? AND ts < ? AND id <= ? AND event_type='STOP_START'
+        ORDER BY ts LIMIT 1
+    """, (line_id, last_end, lo, bound)).fetchone()
+    return {} if row is None else {line_id: (row["ts"], row["stop_reason"])}
+
+def aggregate(conn, d, line_id, bound):
+    lo, hi = CALENDAR.day_window(d)
+    # idx_raw_line_ts (line_id, ts) 범위 스캔
+    rows = conn.execute("""
+        SELECT id, ts, line_id, station_id, event_type, cycle_time, stop_reason
+        FROM raw_events
+        WHERE line_id=? AND ts >= ? AND ts < ? AND id <= ?
+        ORDER BY ts, id
+    """, (line_id, lo, hi, bound)).fetchall()
+
+    deltas = {}
+    for ev, key in zip(rows, bucket_keys(CALENDAR, rows)):
+        fold_event(delta_for(deltas, key), ev)
+
+    open_stops = open_stop_at(conn, line_id, lo, bound)
+    closed = []
+    for ev in rows:
+        downtime.fold_event(open_stops, closed, ev)
+    if line_id in open_stops:
+        row = conn.execute("""
+            SELECT ts FROM raw_events
+            WHERE line_id=? AND ts >= ? AND id <= ? AND event_type='STOP_END'
+            ORDER BY ts LIMIT 1
+        """, (line_id, hi, bound)).fetchone()
+        if row is not None:
+            start, reason = open_stops[line_id]
+            closed.append((line_id, start, row["ts"], reason))
+
+    # 워커와 같이 교대 경계에서 잘라 stop_minutes 에 더하되, 이 일자 구간 밖은 버린다
+    for _, start, end, _ in closed:
+        for p_start, p_end, day, shift in CALENDAR.split(max(start, lo), min(end, hi)):
+            dl = delta_for(deltas, (day, shift, line_id))
+            dl[2] += downtime.minutes(p_end - p_start)
+            dl[8] = max(dl[8], p_end)
+    return deltas
+
+def compute(db_path, day, line_id, bound):
+    # 프로세스 풀에서 실행. 읽기 전용 연결이라 WAL 에서 적재를 막지 않는다
+    conn = connect(db_path, Config.STORAGE_PRAGMAS)
+    conn.row_factory = sqlite3.Row
+    try:
+        return aggregate(conn, date.fromisoformat(day), line_id, bound)
+    finally:
+        conn.close()
+
+def touched(cur, d, line_id, bound, current):
+    # (bound, current] 사이에 워커가 반영한 이벤트 중 이 일자 집계를 바꿀 수 있는 것이 있는가
+    # 체크포인트는 유휴 라인에서도 전진하므로 대부분은 없고, 그러면 계산해 둔 결과를 그대로 쓴다
+    lo, hi = CALENDAR.day_window(d)
+    row = cur.execute("""
+        SELECT 1 FROM raw_events
+        WHERE id > ? AND id <= ? AND line_id=?
+          AND ((ts >= ? AND ts < ?) OR event_type IN ('STOP_START', 'STOP_END'))
+        LIMIT 1
+    """, (bound, current, line_id, lo, hi)).fetchone()
+    return row is not None
+
+def swap(conn, d, line_id, deltas, bound, force=False):
+    # 반영하지 못하면 None (새 체크포인트로 잠금 밖에서 다시 계산해 재시도)
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    current = leases.line_checkpoint(cur, line_id)
+    if current != bound and touched(cur, d, line_id, bound, current):
+        if not force:
+            conn.rollback()
+            return None
+        # 재시도가 계속 밀리면 쓰기 잠금을 쥔 채로 그 지점까지 다시 계산
+        deltas = aggregate(conn, d, line_id, current)
+
+    old = {
+        (r["date"], r["shift"], r["line_id"]): (r["produced_count"], r["defect_count"], r["stop_minutes"])
+        for r in cur.execute("""
+            SELECT date, shift, line_id, produced_count, defect_count, stop_minutes
+            FROM summary_shift WHERE date=? AND line_id=?
+        """, (d.isoformat(), line_id))
+    }
+    cur.execute("DELETE FROM summary_shift WHERE date=? AND line_id=?", (d.isoformat(), line_id))
+    apply_deltas(cur, deltas)
+
+    # 대시보드(SSE)가 바뀐 값을 받도록 이전 값과의 차이를 변경 로그에 남긴다
+    changes = {}
+    for key in old.keys() | deltas.keys():
+        prev = old.get(key, (0, 0, 0))
+        new = deltas.get(key, (0, 0, 0))
+        diff = [new[0] - prev[0], new[1] - prev[1], new[2] - prev[2]]
+        if any(diff):
+            changes[key] = diff
+    publish_changes(cur, changes)
+    leases.bump_generation(cur)
+    conn.commit()
+    return len(deltas), len(old)
+
+def main():
+    ap = argparse.ArgumentParser(description="rebuild summary_shift for past dates from raw_events")
+    ap.add_argument("--from", dest="from_", type=date.fromisoformat, required=True)
+    ap.add_argument("--to", type=date.fromisoformat, required=True)
+    ap.add_argument("--line", action="append", help="limit to these line_ids (repeatable)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--db", default=Config.DB_PATH)
+    args = ap.parse_args()
+
+    conn = connect(args.db, Config.STORAGE_PRAGMAS)
+    conn.row_factory = sqlite3.Row
+    try:
+        lines = args.line or [r[0] for r in conn.execute("""
+            SELECT line_id FROM worker_lease
+            UNION
+            SELECT DISTINCT line_id FROM summary_shift WHERE date BETWEEN ? AND ?
+        """, (args.from_.isoformat(), args.to.isoformat()))]
+        bounds = {}
+        for line_id in lines:
+            bound = leases.line_checkpoint(conn, line_id)
+            if bound is None:
+                print(f"[recompute] skip line={line_id}: no worker checkpoint yet (run the worker first)")
+            else:
+                bounds[line_id] = bound
+
+        days = []
+        d = args.from_
+        while d <= args.to:
+            days.append(d)
+            d += timedelta(days=1)
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(compute, args.db, d.isoformat(), line_id, bound): (d, line_id, bound, 1)
+                for d in days for line_id, bound in bounds.items()
+            }
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for f in done:
+                    d, line_id, bound, attempt = futures.pop(f)
+                    result = swap(conn, d, line_id, f.result(), bound, force=attempt >= MAX_ATTEMPTS)
+                    if result is None:
+                        bound = leases.line_checkpoint(conn, line_id)
+                        futures[pool.submit(compute, args.db, d.isoformat(), line_id, bound)] = (
+                            d, line_id, bound, attempt + 1)
+                        continue
+                    new, old = result
+                    print(f"[recompute] {d} line={line_id} shifts {old} -> {new}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,116 +1,229 @@
 import os
+import sys
 import time
+import signal
+import socket
 import sqlite3
-from datetime import datetime
-
-DB_PATH = os.path.join("instance", "smartfactory.db")
-
-def get_shift(dt: datetime) -> str:
-    return "DAY" if 8 <= dt.hour < 20 else "NIGHT"
-
-def shift_date(dt: datetime) -> str:
-    # NIGHT 교대(20~08): 0~7시는 전날로 귀속
-    if dt.hour < 8:
-        dt = datetime.fromtimestamp(dt.timestamp() - 24*3600)
-    return dt.strftime("%Y-%m-%d")
-
-def ensure_summary_row(cur, date, shift, line_id):
-    cur.execute("""
-        INSERT OR IGNORE INTO summary_shift
-        (date, shift, line_id, produced_count, defect_count, stop_minutes, avg_cycle_time, last_event_ts)
-        VALUES (?, ?, ?, 0, 0, 0, NULL, 0)
-    """, (date, shift, line_id))
-
-def aggregate_incremental_once():
-    conn = sqlite3.connect(DB_PATH)
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config import Config
+from app.storage import connect
+from app.shifts import from_spec
+from app import downtime, leases, rollups, stations, units
+from app.summary import apply_deltas, bucket_keys, delta_for, fold_event, publish_changes
+from app.metrics import (
+    DB_COMMIT_SECONDS, WORKER_LAG_SECONDS, WORKER_PROCESSED_EVENTS, WORKER_TICK_SECONDS,
+    start_http_server, worker_lag,
+)
+
+DB_PATH = Config.DB_PATH
+BATCH_SIZE = 10000
+INTERVAL_SEC = 10
+
+CALENDAR = from_spec(Config.SHIFTS, Config.HOLIDAYS)
+
+def legacy_start(cur):
+    # 체크포인트 도입 전 DB: 기존 summary 가 반영한 시점까지는 건너뛴다
+    row = cur.execute("""
+        SELECT COALESCE(MAX(id), 0) AS id FROM raw_events
+        WHERE ts <= (SELECT COALESCE(MAX(last_event_ts), 0) FROM summary_shift)
+    """).fetchone()
+    return int(row["id"])
+
+def default_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def fold_stops(closed, deltas, minute, hour):
+    # 닫힌 정지 구간을 교대/분/시 버킷별로 잘라 stop_minutes 에 더한다 (라인 단위라 station 은 "")
+    pieces = []
+    for line_id, start, end, reason in closed:
+        # 길이 0 정지도 stop_intervals 에는 기록 (정지 횟수에 포함)
+        spans = CALENDAR.split(start, end) or [(start, end, *CALENDAR.split(start, start + 1)[0][2:])]
+        for p_start, p_end, date, shift in spans:
+            pieces.append((line_id, p_start, p_end, date, shift, reason))
+            d = delta_for(deltas, (date, shift, line_id))
+            d[2] += downtime.minutes(p_end - p_start)
+            d[8] = max(d[8], p_end)
+        for buckets, seconds in ((minute, 60), (hour, 3600)):
+            for bucket, secs in downtime.split_fixed(start, end, seconds):
+                delta_for(buckets, (bucket, line_id, ""))[2] += downtime.minutes(secs)
+    return pieces
+
+def prune_dedupe(cur):
+    cutoff = int(time.time()) - Config.DEDUPE_RETENTION_DAYS * 86400
+    cur.execute("DELETE FROM ingest_dedupe WHERE created_ts < ?", (cutoff,))
+
+def aggregate_incremental_once(owner=None):
+    # 밀린 이벤트가 남아 이번 tick 에서 다 반영하지 못했으면 False
+    with WORKER_TICK_SECONDS.time():
+        return _aggregate_incremental_once(owner or default_owner())
+
+def _aggregate_incremental_once(owner):
+    conn = connect(DB_PATH, Config.STORAGE_PRAGMAS)
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
-
-    summary_rows = cur.execute("""
-        SELECT date, shift, line_id, last_event_ts, produced_count, defect_count, stop_minutes
-        FROM summary_shift
-    """).fetchall()
-
-    last_map = {}
-    for r in summary_rows:
-        last_map[(r["date"], r["shift"], r["line_id"])] = int(r["last_event_ts"] or 0)
-
-    lines = cur.execute("SELECT DISTINCT line_id FROM raw_events").fetchall()
-    line_ids = [r["line_id"] for r in lines]
-
+    # 1) 새 라인 등록 + 리스 갱신/획득 (짧은 쓰기 트랜잭션)
+    cur.execute("BEGIN IMMEDIATE")
+    hi = leases.discover_lines(cur, legacy_start)
+    lines = leases.claim(cur, owner, Config.WORKER_LEASE_SEC)
+    start = leases.load_checkpoints(cur, lines)
+    conn.commit()
+    if not lines:
+        conn.close()
+        print(f"[worker] owner={owner} no lines leased")
+        return True
+
+    # 2) 내 라인의 (체크포인트, hi] 이벤트를 읽어 증분 계산 (쓰기 잠금 없이)
+    # 리스가 만료되기 전에 커밋하도록 한 tick 의 스캔 건수와 시간을 제한하고, 나머지는 다음 tick 으로
+    deadline = time.monotonic() + Config.WORKER_LEASE_SEC / 3
+    last_id = min(start.values())
+    scanned = 0
     processed = 0
-    changed_keys = set()
-
-    for line_id in line_ids:
+    deltas = {}
+    minute = {}
+    hour = {}
+    open_stops = downtime.load_open(cur, lines)
+    closed = []
+    journeys = {}
+    station_stats = {}
+    ct_hist = {}
+    station_state = {}
+    unit_done = {}
 
-        rows = cur.execute("""
-            SELECT ts, line_id, event_type, cycle_time
+    while True:
+        rows = cur.execute(f"""
+            SELECT id, ts, line_id, station_id, unit_id, event_type, cycle_time, defect_code, stop_reason
             FROM raw_events
-            WHERE line_id = ?
-            ORDER BY ts ASC
-        """, (line_id,)).fetchall()
-
-        for ev in rows:
-            dt = datetime.fromtimestamp(ev["ts"])
-            shift = get_shift(dt)
-            date = shift_date(dt) if shift == "NIGHT" else dt.strftime("%Y-%m-%d")
-            key = (date, shift, ev["line_id"])
-
-            last_ts = last_map.get(key, 0)
-            if ev["ts"] <= last_ts:
-                continue
-
-            ensure_summary_row(cur, date, shift, ev["line_id"])
-
-            s = cur.execute("""
-                SELECT produced_count, defect_count, stop_minutes, avg_cycle_time, last_event_ts
-                FROM summary_shift
-                WHERE date=? AND shift=? AND line_id=?
-            """, key).fetchone()
-
-            produced = int(s["produced_count"])
-            defect = int(s["defect_count"])
-            stopm = int(s["stop_minutes"])
-            avg_cycle = s["avg_cycle_time"]
-            last_event_ts = int(s["last_event_ts"])
-
-            et = ev["event_type"]
-            if et == "PRODUCED":
-                produced += 1
-            elif et == "DEFECT":
-                defect += 1
-            elif et == "STOP_MINUTE":
-                stopm += 1
-
-            if ev["cycle_time"] is not None:
-                ct = float(ev["cycle_time"])
-                if avg_cycle is None:
-                    avg_cycle = ct
-                else:
-                    avg_cycle = (float(avg_cycle) + ct) / 2.0
-
-            last_event_ts = max(last_event_ts, ev["ts"])
-
-            cur.execute("""
-                UPDATE summary_shift
-                SET produced_count=?,
-                    defect_count=?,
-                    stop_minutes=?,
-                    avg_cycle_time=?,
-                    last_event_ts=?
-                WHERE date=? AND shift=? AND line_id=?
-            """, (produced, defect, stopm, avg_cycle, last_event_ts, *key))
-
-            last_map[key] = last_event_ts
-            changed_keys.add(key)
-            processed += 1
-
-    conn.commit()
+            WHERE id > ? AND id <= ? AND line_id IN ({",".join("?" * len(lines))})
+            ORDER BY id ASC
+            LIMIT ?
+        """, (last_id, hi, *lines, BATCH_SIZE)).fetchall()
+        fetched = len(rows)
+        if rows:
+            last_id = rows[-1]["id"]
+        # 다른 워커에게서 넘겨받은 라인과 체크포인트가 다를 수 있으므로 이미 반영한 행은 건너뜀
+        rows = [r for r in rows if r["id"] > start[r["line_id"]]]
+
+        stations.prefetch_units(cur, rows, unit_done)
+        stations.prefetch_state(cur, rows, station_state)
+        for ev, key in zip(rows, bucket_keys(CALENDAR, rows)):
+            fold_event(delta_for(deltas, key), ev)
+            stations.fold_event(station_stats, ct_hist, station_state, unit_done, key, ev)
+            ts, line_id, station_id = ev["ts"], ev["line_id"], ev["station_id"] or ""
+            fold_event(delta_for(minute, (ts - ts % 60, line_id, station_id)), ev)
+            fold_event(delta_for(hour, (ts - ts % 3600, line_id, station_id)), ev)
+            downtime.fold_event(open_stops, closed, ev)
+            units.fold_event(journeys, ev)
+
+        processed += len(rows)
+        scanned += fetched
+        if fetched < BATCH_SIZE:
+            last_id = hi
+            break
+        if scanned >= Config.WORKER_TICK_MAX_EVENTS or time.monotonic() >= deadline:
+            break
+
+    pieces = fold_stops(closed, deltas, minute, hour)
+
+    # 3) 리스와 체크포인트가 그대로인지 확인한 뒤 한 트랜잭션으로 반영
+    cur.execute("BEGIN IMMEDIATE")
+    if not leases.verify(cur, owner, start):
+        conn.rollback()
+        conn.close()
+        print(f"[worker] owner={owner} lost a lease during the tick, discarded")
+        return True
+
+    apply_deltas(cur, deltas)
+    downtime.save(cur, open_stops, pieces, lines)
+    units.apply_deltas(cur, journeys)
+    stations.apply_deltas(cur, station_stats, ct_hist, station_state)
+    rollups.apply_deltas(cur, "minute", minute)
+    rollups.apply_deltas(cur, "hour", hour)
+    rollups.refresh_days(cur, hour)
+    rollups.prune_minutes(cur, minute, max(Config.ROLLUP_MINUTE_RETENTION_DAYS, Config.CLIENT_TS_MAX_AGE_DAYS + 1))
+    publish_changes(cur, deltas)
+    prune_dedupe(cur)
+    # last_id 까지의 내 라인 이벤트는 모두 반영했다 (hi 에 못 미쳤으면 다음 tick 이 이어서)
+    leases.save_checkpoints(cur, start, last_id)
+    with DB_COMMIT_SECONDS.labels("worker").time():
+        conn.commit()
+    WORKER_PROCESSED_EVENTS.inc(processed)
+    WORKER_LAG_SECONDS.set(worker_lag(conn, last_id))
     conn.close()
-    print(f"[worker] processed_events={processed}, changed_buckets={len(changed_keys)}")
+    print(f"[worker] owner={owner} lines={len(lines)} processed_events={processed}, "
+          f"changed_buckets={len(deltas)}, last_event_id={last_id}")
+    return last_id >= hi
+
+def release_leases(owner):
+    conn = connect(DB_PATH, Config.STORAGE_PRAGMAS)
+    try:
+        leases.release(conn, owner)
+        conn.commit()
+    finally:
+        conn.close()
+
+def run(metrics_port=0, stop=None):
+    # 프로세스 하나 = 워커 하나. 종료 시 리스를 놓아 다른 워커가 바로 가져가게 한다
+    owner = default_owner()
+    if metrics_port:
+        start_http_server(metrics_port)
+    try:
+        while True:
+            # 밀려 있으면 쉬지 않고 바로 다음 tick
+            if not aggregate_incremental_once(owner):
+                if stop is not None and stop.is_set():
+                    break
+                continue
+            if stop is None:
+                time.sleep(INTERVAL_SEC)
+            elif stop.wait(INTERVAL_SEC):
+                break
+    finally:
+        release_leases(owner)
+
+_stop = None
+
+def _init_pooled(stop):
+    # 종료는 부모가 stop 이벤트로 알린다 (tick 중간에 끊기지 않게)
+    global _stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    _stop = stop
+
+def _run_pooled(metrics_port):
+    run(metrics_port, _stop)
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def main():
+    ap = argparse.ArgumentParser(description="incremental summary/rollup worker")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="worker processes; lines are split between them through worker_lease")
+    args = ap.parse_args()
+
+    port = Config.WORKER_METRICS_PORT
+    if args.workers <= 1:
+        run(port)
+        return
+
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_pooled, initargs=(stop,)) as pool:
+        # 워커마다 /metrics 포트를 하나씩 (WORKER_METRICS_PORT, +1, ...)
+        futures = [pool.submit(_run_pooled, port + i if port else 0) for i in range(args.workers)]
+        try:
+            for f in futures:
+                f.result()
+        except KeyboardInterrupt:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            print("[worker] stopping, waiting for running ticks")
+            stop.set()
 
 if __name__ == "__main__":
-    while True:
-        aggregate_incremental_once()
-        time.sleep(10)
+    main()
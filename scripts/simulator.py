@@ -1,4 +1,5 @@
 import time
+import uuid
 import random
 import argparse
 import requests
@@ -6,13 +7,63 @@ from datetime import datetime
 
 EVENT_TYPES = ["PRODUCED", "DEFECT", "STOP_START", "STOP_END"]
 
-def post_event(base_url: str, payload: dict):
+def post_event(base_url: str, payload: dict, retries: int = 2):
+    # event_id 가 있으므로 타임아웃 후 같은 payload 로 재전송해도 서버가 중복을 걸러낸다
     url = f"{base_url.rstrip('/')}/api/events"
-    r = requests.post(url, json=payload, timeout=5)
+    for attempt in range(retries + 1):
+        try:
+            r = requests.post(url, json=payload, timeout=5)
+            break
+        except requests.RequestException:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * (attempt + 1))
     if r.status_code >= 400:
         raise RuntimeError(f"POST failed {r.status_code}: {r.text}")
     return r.json() if r.headers.get("content-type", "").startswith("application/json") else {"ok": True}
 
+class DeviceState:
+    def __init__(self, unit_prefix="U"):
+        self.unit_prefix = unit_prefix
+        self.unit_no = 1
+        self.stopped = False
+
+def next_events(rng, state, device, line, station,
+                defect_p=0.08, stop_start_p=0.03, stop_end_p=0.35, defect_station="ST3"):
+    # 한 사이클: 생산 1건 + (검사 스테이션) 확률적 불량 + 라인 정지 시작/종료
+    unit_id = f"{state.unit_prefix}-{state.unit_no:05d}"
+    state.unit_no += 1
+
+    events = [{
+        "device_id": device,
+        "line_id": line,
+        "station_id": station,
+        "event_type": "PRODUCED",
+        "unit_id": unit_id,
+        "cycle_time": round(rng.uniform(8.0, 16.0), 2),
+    }]
+
+    if station == defect_station and rng.random() < defect_p:
+        events.append({
+            "device_id": device,
+            "line_id": line,
+            "station_id": station,
+            "event_type": "DEFECT",
+            "unit_id": unit_id,
+        })
+
+    if (not state.stopped) and rng.random() < stop_start_p:
+        events.append({"device_id": device, "line_id": line, "event_type": "STOP_START"})
+        state.stopped = True
+
+    if state.stopped and rng.random() < stop_end_p:
+        events.append({"device_id": device, "line_id": line, "event_type": "STOP_END"})
+        state.stopped = False
+
+    for ev in events:
+        ev["event_id"] = uuid.uuid4().hex
+    return events
+
 def main():
     ap = argparse.ArgumentParser(description="Smart Factory event simulator (POST /api/events)")
     ap.add_argument("--base", default="http://localhost:5000", help="server base url (ex: http://localhost:5000)")
@@ -21,6 +72,7 @@ def main():
     ap.add_argument("--minutes", type=float, default=1.0, help="how long to run")
     ap.add_argument("--rate", type=float, default=1.0, help="events per second (approx)")
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--spool", help="local edge queue path; events survive server outages (see edge_agent.py)")
 
     ap.add_argument("--defect_p", type=float, default=0.08, help="defect probability per produced (0~1)")
     ap.add_argument("--stop_start_p", type=float, default=0.03, help="probability to start stop per loop (0~1)")
@@ -33,8 +85,7 @@ def main():
     start = time.time()
     end = start + args.minutes * 60
 
-    unit_no = 1
-    stopped = False
+    state = DeviceState()
     produced = 0
     defects = 0
     stops_started = 0
@@ -42,63 +93,50 @@ def main():
 
     interval = max(0.01, 1.0 / max(args.rate, 0.001))
 
+    uploader = None
+    if args.spool:
+        from edge_agent import EdgeQueue, Uploader
+        spool = EdgeQueue(args.spool)
+        uploader = Uploader(spool, args.base)
+        uploader.start()
+
     print(f"[sim] start {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"[sim] base={args.base}, line={args.line}, minutes={args.minutes}, rate={args.rate}/s")
 
     while time.time() < end:
         station = random.choice(stations)
-        unit_id = f"U-{unit_no:05d}"
-        unit_no += 1
-
-        cycle_time = round(random.uniform(8.0, 16.0), 2)
-        post_event(args.base, {
-            "device_id": args.device,
-            "line_id": args.line,
-            "station_id": station,
-            "event_type": "PRODUCED",
-            "unit_id": unit_id,
-            "cycle_time": cycle_time
-        })
-        produced += 1
-
-        if station == "ST3" and random.random() < args.defect_p:
-            post_event(args.base, {
-                "device_id": args.device,
-                "line_id": args.line,
-                "station_id": station,
-                "event_type": "DEFECT",
-                "unit_id": unit_id
-            })
-            defects += 1
-
-        if (not stopped) and random.random() < args.stop_start_p:
-            post_event(args.base, {
-                "device_id": args.device,
-                "line_id": args.line,
-                "event_type": "STOP_START"
-            })
-            stopped = True
-            stops_started += 1
-
-        if stopped and random.random() < args.stop_end_p:
-            post_event(args.base, {
-                "device_id": args.device,
-                "line_id": args.line,
-                "event_type": "STOP_END"
-            })
-            stopped = False
-            stops_ended += 1
+        events = next_events(random, state, args.device, args.line, station,
+                             args.defect_p, args.stop_start_p, args.stop_end_p)
+        if uploader is not None:
+            spool.append(events)
+        for ev in events:
+            if uploader is None:
+                post_event(args.base, ev)
+            et = ev["event_type"]
+            if et == "PRODUCED":
+                produced += 1
+            elif et == "DEFECT":
+                defects += 1
+            elif et == "STOP_START":
+                stops_started += 1
+            elif et == "STOP_END":
+                stops_ended += 1
 
         time.sleep(interval)
 
-    if stopped:
-        post_event(args.base, {
-            "device_id": args.device,
-            "line_id": args.line,
-            "event_type": "STOP_END"
-        })
+    if state.stopped:
+        ev = {"device_id": args.device, "line_id": args.line, "event_type": "STOP_END"}
+        if uploader is not None:
+            spool.append([ev])
+        else:
+            post_event(args.base, ev)
         stops_ended += 1
 
+    if uploader is not None:
+        uploader.stop()
+        print(f"[sim] spool pending={spool.pending()}")
+        spool.close()
+
     print("[sim] done")
     print(f"[sim] produced={produced}, defects={defects}, stop_start={stops_started}, stop_end={stops_ended}")
 